@@ -1,18 +1,114 @@
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_cors import CORS
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+import atexit
+import logging
+import logging.handlers
 import os
+import queue
+import sqlite3
+import threading
 from dotenv import load_dotenv
 
 load_dotenv()
 
 db = SQLAlchemy()
-migrate = Migrate()
+
+# Upload directories already created in this process
+_uploads_ready = set()
+
+
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """Make SQLite enforce foreign keys like Postgres does.
+
+    SQLite ignores them unless each connection opts in, and routes rely on
+    the chat_session_id key to reject messages for unknown sessions.
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+class _PerProcessQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler whose listener thread runs in the process that logs.
+
+    The app is built in the gunicorn master (preload_app) and workers are
+    forked from it, and threads don't survive a fork. The listener is
+    therefore started on the first record each process emits, with a fresh
+    queue, so every worker drains its own records.
+    """
+
+    def __init__(self, handlers):
+        super().__init__(queue.SimpleQueue())
+        self.target_handlers = handlers
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Runs single-threaded in the child; the parent's lock may be held
+        self._start_lock = threading.Lock()
+        self._listener = None
+        self._pid = None
+
+    def _ensure_listener(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.SimpleQueue()
+            self._listener = logging.handlers.QueueListener(
+                self.queue, *self.target_handlers, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._ensure_listener()
+        super().enqueue(record)
+
+    def stop(self):
+        """Flush queued records; called at interpreter exit."""
+        listener = self._listener
+        if listener is not None and self._pid == os.getpid():
+            self._listener = None
+            self._pid = None
+            listener.stop()
+
+
+def _configure_queue_logging(app):
+    """Hand app.logger records to a background thread.
+
+    Request threads only enqueue the record; the handlers Flask configured
+    (stderr under gunicorn) run on the listener thread, so a slow log sink
+    doesn't stall responses.
+    """
+    previous = [h for h in app.logger.handlers if isinstance(h, _PerProcessQueueHandler)]
+    handlers = [h for h in app.logger.handlers if not isinstance(h, logging.handlers.QueueHandler)]
+    for handler in previous:
+        handler.stop()
+        handlers = handlers or handler.target_handlers
+    if not handlers:
+        from flask.logging import default_handler
+        handlers = [default_handler]
+
+    queue_handler = _PerProcessQueueHandler(handlers)
+    app.logger.handlers = [queue_handler]
+    atexit.register(queue_handler.stop)
 
 def create_app(config_name=None):
     app = Flask(__name__)
     
+    # Serialize jsonify/get_json through orjson
+    from .json_provider import OrjsonProvider
+    app.json = OrjsonProvider(app)
+    
     # Load configuration
     if config_name == 'testing':
         from .config import TestingConfig
@@ -24,26 +120,64 @@ def create_app(config_name=None):
         # Configure the SQLAlchemy part of the app (only for non-testing)
         app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'postgresql://postgres:postgres@db:5432/webapp')
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+        # Keep a warm Postgres pool so concurrent Live-API/analytics requests
+        # don't queue behind the SQLAlchemy defaults (pool_size=5, overflow=10).
+        # SQLite (local dev) uses a pool that rejects these options, so it
+        # keeps the dialect defaults.
+        if make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name() != 'sqlite':
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+                'pool_size': int(os.getenv('DB_POOL_SIZE', 30)),
+                'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+                'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+                'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 3600)),
+                'pool_pre_ping': True,
+            }
+
+    # Enable CORS for frontend connections with proper preflight handling.
+    # Scoped to /api/* so static files skip CORS header assembly. The
+    # analytics endpoints stay open to any origin without credentials.
+    # max_age lets browsers cache preflight results instead of sending an
+    # OPTIONS round-trip before every POST.
+    CORS(app, max_age=int(os.getenv('CORS_MAX_AGE', 86400)), resources={
+        r"/api/analytics/*": {
+            "origins": "*",
+            "supports_credentials": False,
+        },
+        r"/api/*": {
+            "origins": ['http://localhost:3000', 'http://127.0.0.1:3000'],
+            "methods": ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
+            "allow_headers": ['Content-Type', 'Authorization'],
+            "supports_credentials": True,
+        }
+    })
     
-    # Enable CORS for frontend connections with proper preflight handling
-    CORS(app, 
-         origins=['http://localhost:3000', 'http://127.0.0.1:3000'],
-         methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-         allow_headers=['Content-Type', 'Authorization'],
-         supports_credentials=True)
-    
+    # Outside tests and debug runs, don't let logging block request threads
+    if config_name != 'testing' and not app.debug:
+        _configure_queue_logging(app)
+
     # Initialize extensions
     db.init_app(app)
-    migrate.init_app(app, db)
+
+    # Flask-Migrate pulls in Alembic/Mako, so request workers skip it. It is
+    # wired up whenever the `flask` CLI loads the app (so `flask db ...`
+    # works), for debug runs, and when FLASK_ENABLE_MIGRATE=1 is set
+    if click.get_current_context(silent=True) is not None or os.getenv('FLASK_ENABLE_MIGRATE') or app.debug:
+        from flask_migrate import Migrate
+        Migrate().init_app(app, db)
     
     # Create uploads directory (only for non-testing)
     if config_name != 'testing':
-        with app.app_context():
-            uploads_dir = os.path.join(app.root_path, 'static', 'uploads')
+        uploads_dir = os.path.join(app.root_path, 'static', 'uploads')
+        if uploads_dir not in _uploads_ready:
             os.makedirs(uploads_dir, exist_ok=True)
+            _uploads_ready.add(uploads_dir)
     
     # Register blueprints
-    from .api import api as api_blueprint
+    from .api import api as api_blueprint, register_routes, register_video_routes
+    register_routes()
     app.register_blueprint(api_blueprint, url_prefix='/api')
+    if app.config.get('ENABLE_VIDEO_CREATION'):
+        register_video_routes(app, url_prefix='/api')
 
     return app 
\ No newline at end of file
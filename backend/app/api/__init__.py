@@ -2,12 +2,40 @@ from flask import Blueprint
 
 api = Blueprint('api', __name__)
 
-from . import routes
-from .analytics_routes import analytics_bp
-from .auth_routes import auth_bp
+_routes_registered = False
 
-# Register the Analytics blueprint (for logging Live API usage)
-api.register_blueprint(analytics_bp, url_prefix='/analytics')
+def register_routes():
+    """Attach the route modules to the ``api`` blueprint.
 
-# Register the Authentication blueprint
-api.register_blueprint(auth_bp, url_prefix='/auth') 
\ No newline at end of file
+    Deferred until ``create_app`` runs so that importing a single submodule
+    (e.g. ``auth_routes`` from a test) doesn't pull in ``routes`` and, through
+    it, the LLM provider SDKs.
+    """
+    global _routes_registered
+    if _routes_registered:
+        return
+
+    from . import routes
+    from .analytics_routes import analytics_bp
+    from .auth_routes import auth_bp
+
+    # Register the Analytics blueprint (for logging Live API usage)
+    api.register_blueprint(analytics_bp, url_prefix='/analytics')
+
+    # Register the Authentication blueprint
+    api.register_blueprint(auth_bp, url_prefix='/auth')
+
+    _routes_registered = True
+
+def register_video_routes(app, url_prefix='/api'):
+    """Attach the session video export endpoints (ENABLE_VIDEO_CREATION) to *app*.
+
+    Kept separate from ``register_routes`` because ``video_creation`` imports
+    the video processor and its GCS client, which most deployments never use.
+    The blueprint goes on the app itself, next to ``api``, rather than being
+    nested in the shared ``api`` blueprint: ``api`` can't take new children
+    once an app has registered it, and the flag is read per app.
+    """
+    from .video_creation import video_creation_bp
+
+    app.register_blueprint(video_creation_bp, url_prefix=url_prefix)
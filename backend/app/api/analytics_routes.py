@@ -7,103 +7,187 @@ Frontend connects directly to Google; backend just logs for analytics.
 """
 
 import logging
-from datetime import datetime
-from flask import Blueprint, request, jsonify
-from flask_cors import cross_origin
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from time import time_ns
+import orjson
+from flask import Blueprint, Response, request, jsonify
 
 logger = logging.getLogger(__name__)
 
+
+def _now_ms():
+    """Current UTC time as integer milliseconds since the epoch"""
+    return time_ns() // 1_000_000
+
+
+def _response_timestamp(ts):
+    """Render a ms timestamp for the response; ISO 8601 when ?format=iso"""
+    if request.args.get('format') == 'iso':
+        return datetime.fromtimestamp(ts / 1000, timezone.utc).isoformat()
+    return ts
+
+# Analytics records are handed off to a background drain thread so the
+# request returns as soon as the record is built
+ANALYTICS_QUEUE_SIZE = int(os.getenv('ANALYTICS_QUEUE_SIZE', 10000))
+_ANALYTICS_BATCH_SIZE = 100
+
+_analytics_q = queue.Queue(maxsize=ANALYTICS_QUEUE_SIZE)
+_analytics_dropped = 0
+_drain_thread = None
+_drain_lock = threading.Lock()
+
+
+def _drain_analytics():
+    """Pop queued analytics records in batches and write them to the log"""
+    while True:
+        batch = [_analytics_q.get()]
+        try:
+            while len(batch) < _ANALYTICS_BATCH_SIZE:
+                batch.append(_analytics_q.get_nowait())
+        except queue.Empty:
+            pass
+
+        for message, record in batch:
+            try:
+                logger.info(message, record)
+            except Exception:
+                pass
+            _analytics_q.task_done()
+
+
+def _ensure_drain_thread():
+    global _drain_thread
+    if _drain_thread is not None and _drain_thread.is_alive():
+        return
+    with _drain_lock:
+        if _drain_thread is None or not _drain_thread.is_alive():
+            _drain_thread = threading.Thread(
+                target=_drain_analytics, name='analytics-drain', daemon=True
+            )
+            _drain_thread.start()
+
+
+def _enqueue(message, record):
+    """Queue a record for the drain thread, dropping it if the queue is full"""
+    global _analytics_dropped
+    _ensure_drain_thread()
+    try:
+        _analytics_q.put_nowait((message, record))
+    except queue.Full:
+        _analytics_dropped += 1
+        if _analytics_dropped % 1000 == 1:
+            logger.warning("Analytics queue full, %d records dropped so far", _analytics_dropped)
+
 # Create Blueprint for analytics
 analytics_bp = Blueprint('analytics', __name__)
 
+# The health payload never changes, so serialize it once; orchestrator
+# liveness probes hit this endpoint every few seconds.
+_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "service": "analytics",
+    "message": "Analytics service is running"
+})
+
+# In a real app, you'd query a database here. For now, return mock stats.
+_MOCK_STATS = {
+    "total_sessions_today": 0,
+    "active_sessions": 0,
+    "total_interactions": 0,
+    "average_session_duration": 0,
+    "popular_voices": {
+        "Puck": 45,
+        "Aoede": 32,
+        "Kore": 23
+    }
+}
+
 @analytics_bp.route('/health', methods=['GET'])
-@cross_origin()
 def health_check():
     """Simple health check"""
-    return jsonify({
-        "status": "healthy",
-        "service": "analytics",
-        "message": "Analytics service is running"
-    })
+    return Response(_HEALTH_BODY, mimetype='application/json')
 
 @analytics_bp.route('/log-session-start', methods=['POST'])
-@cross_origin()
 def log_session_start():
     """Log when a user starts a Live API session"""
     try:
         data = request.get_json() or {}
+        timestamp = _now_ms()
         
-        session_data = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "session_type": data.get("session_type", "unknown"),
-            "voice": data.get("voice", "unknown"),
-            "model": data.get("model", "unknown"),
-            "user_agent": request.headers.get("User-Agent", "unknown"),
-            "ip_address": request.remote_addr
-        }
-        
-        logger.info(f"Live API session started: {session_data}")
+        # Only build the log record when INFO is actually emitted
+        if logger.isEnabledFor(logging.INFO):
+            session_data = {
+                "timestamp": timestamp,
+                "session_type": data.get("session_type", "unknown"),
+                "voice": data.get("voice", "unknown"),
+                "model": data.get("model", "unknown"),
+                "user_agent": request.headers.get("User-Agent", "unknown"),
+                "ip_address": request.remote_addr
+            }
+            _enqueue("Live API session started: %s", session_data)
         
         return jsonify({
             "success": True,
             "message": "Session start logged",
-            "timestamp": session_data["timestamp"]
+            "timestamp": _response_timestamp(timestamp)
         })
         
     except Exception as e:
-        logger.error(f"Error logging session start: {e}")
+        logger.error("Error logging session start: %s", e)
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
 @analytics_bp.route('/log-session-end', methods=['POST'])
-@cross_origin()
 def log_session_end():
     """Log when a user ends a Live API session"""
     try:
         data = request.get_json() or {}
+        timestamp = _now_ms()
         
-        session_data = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "session_duration": data.get("duration_seconds", 0),
-            "messages_sent": data.get("messages_sent", 0),
-            "audio_chunks_sent": data.get("audio_chunks_sent", 0),
-            "video_frames_sent": data.get("video_frames_sent", 0),
-            "ip_address": request.remote_addr
-        }
-        
-        logger.info(f"Live API session ended: {session_data}")
+        if logger.isEnabledFor(logging.INFO):
+            session_data = {
+                "timestamp": timestamp,
+                "session_duration": data.get("duration_seconds", 0),
+                "messages_sent": data.get("messages_sent", 0),
+                "audio_chunks_sent": data.get("audio_chunks_sent", 0),
+                "video_frames_sent": data.get("video_frames_sent", 0),
+                "ip_address": request.remote_addr
+            }
+            _enqueue("Live API session ended: %s", session_data)
         
         return jsonify({
             "success": True,
             "message": "Session end logged",
-            "timestamp": session_data["timestamp"]
+            "timestamp": _response_timestamp(timestamp)
         })
         
     except Exception as e:
-        logger.error(f"Error logging session end: {e}")
+        logger.error("Error logging session end: %s", e)
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
 @analytics_bp.route('/log-interaction', methods=['POST'])
-@cross_origin()
 def log_interaction():
     """Log user interactions for analytics"""
     try:
         data = request.get_json() or {}
         
-        interaction_data = {
-            "timestamp": datetime.utcnow().isoformat(),
-            "interaction_type": data.get("type", "unknown"),  # text, audio, video
-            "content_length": data.get("content_length", 0),
-            "response_time_ms": data.get("response_time_ms", 0),
-            "ip_address": request.remote_addr
-        }
-        
-        logger.info(f"Live API interaction: {interaction_data}")
+        if logger.isEnabledFor(logging.INFO):
+            interaction_data = {
+                "timestamp": _now_ms(),
+                "interaction_type": data.get("type", "unknown"),  # text, audio, video
+                "content_length": data.get("content_length", 0),
+                "response_time_ms": data.get("response_time_ms", 0),
+                "ip_address": request.remote_addr
+            }
+            _enqueue("Live API interaction: %s", interaction_data)
         
         return jsonify({
             "success": True,
@@ -111,39 +195,24 @@ def log_interaction():
         })
         
     except Exception as e:
-        logger.error(f"Error logging interaction: {e}")
+        logger.error("Error logging interaction: %s", e)
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
 @analytics_bp.route('/stats', methods=['GET'])
-@cross_origin()
 def get_stats():
     """Get basic usage statistics"""
     try:
-        # In a real app, you'd query a database here
-        # For now, return mock stats
-        stats = {
-            "total_sessions_today": 0,
-            "active_sessions": 0,
-            "total_interactions": 0,
-            "average_session_duration": 0,
-            "popular_voices": {
-                "Puck": 45,
-                "Aoede": 32,
-                "Kore": 23
-            }
-        }
-        
         return jsonify({
             "success": True,
-            "stats": stats,
-            "timestamp": datetime.utcnow().isoformat()
+            "stats": _MOCK_STATS,
+            "timestamp": _response_timestamp(_now_ms())
         })
         
     except Exception as e:
-        logger.error(f"Error getting stats: {e}")
+        logger.error("Error getting stats: %s", e)
         return jsonify({
             "success": False,
             "error": str(e)
@@ -2,39 +2,204 @@ from flask import jsonify, request, Response, stream_with_context, current_app
 from . import api
 from .. import db
 from ..models import Task, ChatMessage, ChatSession, InteractionLog, InteractionMetadata, InteractionMediaData, InteractionSessionSummary
-from app.llm_providers import OpenAIProvider, GeminiProvider
 from app.services.storage import GCSStorageService
+from app.services.response_cache import llm_response_cache
 import json
+import orjson
 import os
+import re
 from werkzeug.utils import secure_filename
-import base64
+try:
+    # SIMD base64 codec with the stdlib API; media payloads are decoded on
+    # every interaction log, so this is worth having where it installs
+    import pybase64 as base64
+except ImportError:
+    import base64
 import hashlib
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 from io import BytesIO
 import requests
 from ..api.auth_routes import require_auth
 from ..services.auth_service import auth_service
 from sqlalchemy.orm import selectinload
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared worker pool for background GCS uploads of interaction media, instead
+# of spawning a fresh thread for every logged chunk
+_UPLOAD_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv('UPLOAD_WORKERS', min(32, (os.cpu_count() or 1) * 2))),
+    thread_name_prefix='gcs-upload'
+)
+atexit.register(_UPLOAD_EXECUTOR.shutdown, wait=False)
+
+# Cap on uploads queued or running in _UPLOAD_EXECUTOR. Each pending job pins
+# its decoded media in memory, so past the cap new media is stored hash-only
+# instead of letting the backlog grow without bound while GCS is slow.
+MAX_PENDING_UPLOADS = int(os.getenv('MAX_PENDING_UPLOADS', 256))
+_pending_uploads = 0
+_pending_uploads_lock = threading.Lock()
+
+def _upload_capacity_available():
+    return _pending_uploads < MAX_PENDING_UPLOADS
+
+def _submit_upload(fn, *args):
+    """Submit a background upload and track it against MAX_PENDING_UPLOADS"""
+    global _pending_uploads
+    with _pending_uploads_lock:
+        _pending_uploads += 1
+    future = _UPLOAD_EXECUTOR.submit(fn, *args)
+    future.add_done_callback(_upload_done)
+    return future
+
+def _upload_done(_future):
+    global _pending_uploads
+    with _pending_uploads_lock:
+        _pending_uploads -= 1
 
 # Helper function to check if file type is allowed
 def allowed_file(filename):
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp', 'mp4', 'webm', 'mov', 'wav', 'mp3', 'm4a', 'ogg', 'flac', 'aac'}
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+_BASE64_CHARS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=')
+
+# (file_extension, content_type) for base64 media by interaction type
+_MEDIA_FILE_TYPES = {
+    'audio_chunk': ('pcm', 'audio/pcm'),
+    'video_frame': ('jpg', 'image/jpeg'),
+}
+
+# Interaction metadata keys stored in same-named InteractionMetadata columns
+_METADATA_COLUMNS = (
+    'frame_rate', 'audio_sample_rate', 'audio_format', 'video_format',
+    'compression_quality', 'data_size_bytes', 'processing_time_ms',
+    'api_endpoint', 'api_response_time_ms', 'api_status_code', 'camera_on',
+    'microphone_on', 'is_connected',
+)
+# Keys that are never copied into custom_metadata
+_STANDARD_METADATA_FIELDS = frozenset(_METADATA_COLUMNS) | {
+    'video_resolution', 'timestamp', 'frontend_logged_at',
+}
+
+def _b64decode_padded(data):
+    """Decode base64 that may be missing its trailing '=' padding"""
+    missing_padding = len(data) % 4
+    if missing_padding == 0:
+        return base64.b64decode(data)
+    # Pad an ASCII bytearray in place rather than building a second
+    # multi-MB str with `data + '=='` that b64decode would then re-encode
+    buf = bytearray(data, 'ascii') if isinstance(data, str) else bytearray(data)
+    buf += b'=' * (4 - missing_padding)
+    return base64.b64decode(buf)
+
+def _decode_interaction_media(interaction_type, raw):
+    """Decode logged media data into (bytes, file_extension, content_type).
+
+    api_response data is a JSON envelope around base64 audio, bare base64
+    audio, or plain text; text_input is always plain text; anything else is
+    base64 media typed by its interaction type.
+    """
+    if interaction_type == 'api_response':
+        try:
+            json_data = json.loads(raw)
+            if isinstance(json_data, dict) and 'data' in json_data:
+                return _b64decode_padded(json_data['data']), 'pcm', json_data.get('mimeType', 'audio/pcm')
+            return raw.encode('utf-8'), 'json', 'application/json'
+        except Exception:
+            # If it's very long and looks like base64, it's probably audio
+            if len(raw) > 1000 and _BASE64_CHARS.issuperset(raw[:100]):
+                try:
+                    return _b64decode_padded(raw), 'pcm', 'audio/pcm'
+                except Exception:
+                    pass
+            # Short content or not base64-like, treat as text
+            return raw.encode('utf-8'), 'txt', 'text/plain'
+    
+    if interaction_type == 'text_input':
+        # Text input is always plain text - don't try to base64 decode
+        return raw.encode('utf-8'), 'txt', 'text/plain'
+    
+    try:
+        decoded_data = _b64decode_padded(raw)
+    except Exception:
+        return raw.encode('utf-8'), 'txt', 'text/plain'
+    file_extension, content_type = _MEDIA_FILE_TYPES.get(interaction_type, ('bin', 'application/octet-stream'))
+    return decoded_data, file_extension, content_type
+
+def _sse_frame(payload):
+    """Encode one server-sent event frame as bytes, ready for the socket"""
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+# Frames on the per-token path are prebuilt: the done frame never changes and
+# a delta frame only needs its text escaped, not a whole dict serialised
+_SSE_DONE = _sse_frame({'done': True})
+_SSE_DELTA_PREFIX = b'data: {"delta":'
+_SSE_DELTA_SUFFIX = b'}\n\n'
+
+def _sse_delta(text):
+    """Encode a streamed text delta as an SSE frame"""
+    return _SSE_DELTA_PREFIX + orjson.dumps(text) + _SSE_DELTA_SUFFIX
+
+# Only the timestamp changes between health probes, so the body is spliced
+# from fixed bytes instead of going through jsonify
+_HEALTH_PREFIX = b'{"status":"healthy","timestamp":"'
+_HEALTH_SUFFIX = b'"}'
+
 @api.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "timestamp": datetime.utcnow().isoformat()}), 200
+    body = _HEALTH_PREFIX + datetime.utcnow().isoformat().encode() + _HEALTH_SUFFIX
+    return Response(body, mimetype='application/json')
+
+# ChatMessage.row_to_dict re-signs GCS media URLs (valid for 168h) on every
+# call, so message list ETags also roll over once per window. A body a
+# client revalidates into is then never more than a day old and its signed
+# URLs are still valid.
+_MEDIA_URL_EPOCH_SECONDS = 24 * 3600
+
+
+def _media_url_epoch():
+    return int(time.time() // _MEDIA_URL_EPOCH_SECONDS)
+
+
+def _versioned_json(version, payload):
+    """Return payload() as JSON with a weak ETag derived from *version*.
+
+    *version* is a small tuple (row count, newest id, ...) that changes
+    whenever the listed rows do. A client polling with a matching
+    If-None-Match gets a 304 without the list being queried or encoded.
+    """
+    etag = hashlib.sha1(repr(tuple(version)).encode()).hexdigest()[:20]
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload())
+    response.set_etag(etag, weak=True)
+    # Browsers keep the body but revalidate before every reuse
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 @api.route('/tasks', methods=['GET'])
 def get_tasks():
-    tasks = Task.query.all()
-    return jsonify([task.to_dict() for task in tasks]), 200
+    version = db.session.execute(
+        select(func.count(Task.id), func.max(Task.id), func.max(Task.updated_at))
+    ).one()
+
+    def payload():
+        rows = db.session.execute(select(*Task.dict_columns())).all()
+        return [Task.row_to_dict(row) for row in rows]
+
+    return _versioned_json(version, payload)
 
 @api.route('/tasks/<int:task_id>', methods=['GET'])
 def get_task(task_id):
-    task = Task.query.get_or_404(task_id)
+    task = db.get_or_404(Task, task_id)
     return jsonify(task.to_dict()), 200
 
 @api.route('/tasks', methods=['POST'])
@@ -57,7 +222,7 @@ def create_task():
 
 @api.route('/tasks/<int:task_id>', methods=['PUT'])
 def update_task(task_id):
-    task = Task.query.get_or_404(task_id)
+    task = db.get_or_404(Task, task_id)
     data = request.get_json()
     
     if 'title' in data:
@@ -73,7 +238,7 @@ def update_task(task_id):
 
 @api.route('/tasks/<int:task_id>', methods=['DELETE'])
 def delete_task(task_id):
-    task = Task.query.get_or_404(task_id)
+    task = db.get_or_404(Task, task_id)
     
     db.session.delete(task)
     db.session.commit()
@@ -83,8 +248,16 @@ def delete_task(task_id):
 # Chat Message Routes
 @api.route('/messages', methods=['GET'])
 def get_messages():
-    messages = ChatMessage.query.order_by(ChatMessage.timestamp.asc()).all()
-    return jsonify([message.to_dict() for message in messages]), 200
+    # Messages are never edited, so their count and newest id identify the list
+    version = db.session.execute(select(func.count(ChatMessage.id), func.max(ChatMessage.id))).one()
+
+    def payload():
+        rows = db.session.execute(
+            select(*ChatMessage.dict_columns()).order_by(ChatMessage.timestamp.asc())
+        ).all()
+        return [ChatMessage.row_to_dict(row) for row in rows]
+
+    return _versioned_json((*version, _media_url_epoch()), payload)
 
 @api.route('/messages', methods=['POST'])
 def create_message():
@@ -117,8 +290,12 @@ def get_chat_sessions():
         return jsonify({"error": "User not found"}), 401
     
     # Only return sessions for the authenticated user
-    sessions = ChatSession.query.filter_by(user_id=user.id).order_by(ChatSession.created_at.desc()).all()
-    return jsonify([session.to_dict() for session in sessions]), 200
+    rows = db.session.execute(
+        select(*ChatSession.dict_columns())
+        .where(ChatSession.user_id == user.id)
+        .order_by(ChatSession.created_at.desc())
+    ).all()
+    return jsonify([ChatSession.row_to_dict(row) for row in rows]), 200
 
 @api.route('/chat_sessions', methods=['POST'])
 @require_auth
@@ -133,9 +310,12 @@ def create_chat_session():
     
     session = ChatSession(provider=provider, user_id=user.id)
     db.session.add(session)
+    # Serialize between the INSERT and the commit: the id and defaults are
+    # set by then, and after commit they'd be expired and reloaded
+    db.session.flush()
+    result = session.to_dict()
     db.session.commit()
-    db.session.refresh(session)
-    return jsonify(session.to_dict()), 201
+    return jsonify(result), 201
 
 @api.route('/chat_sessions/<int:session_id>', methods=['DELETE'])
 @require_auth
@@ -177,16 +357,159 @@ def update_chat_session_provider(session_id):
     
     return jsonify(session.to_dict()), 200
 
+# Columns the providers are sent, read as plain rows instead of ChatMessage
+# objects so long histories skip ORM hydration
+_HISTORY_COLUMNS = (ChatMessage.sender, ChatMessage.text, ChatMessage.media_url, ChatMessage.media_type)
+
+
+def _to_openai(row):
+    """Build an OpenAI message from a (sender, text, media_url, media_type) row."""
+    sender, text, media_url, media_type = row[:4]
+    # OpenAI expects role (user/assistant) and content
+    msg = {"role": 'user' if sender == 'user' else 'assistant', "content": text or ""}
+    if media_url and media_type:
+        msg['media_url'] = media_url
+        msg['media_type'] = media_type
+    return msg
+
+
+def _to_gemini(row):
+    """Build a Gemini message from a (sender, text, media_url, media_type) row."""
+    sender, text, media_url, media_type = row[:4]
+    # Gemini expects sender (user/bot) and text
+    msg = {"sender": sender, "text": text}
+    if media_url and media_type:
+        msg['media_url'] = media_url
+        msg['media_type'] = media_type
+    return msg
+
+
+_BUILDERS = {'openai': _to_openai, 'gemini': _to_gemini}
+
+
+def _build_provider_messages(rows, provider_name):
+    """Convert history rows to *provider_name*'s message format."""
+    build = _BUILDERS[provider_name]
+    return [build(row) for row in rows]
+
+
+# Providers report failures as text in the reply. Each set of markers is
+# matched in a single pass instead of one substring scan per marker.
+_REPLY_ERROR_RE = re.compile(r"Error:|blocked by Gemini|Provider error")
+_STREAM_ERROR_RE = re.compile(r"Error streaming from|Content stream blocked|Error communicating with Gemini")
+
+
+def _response_cache_key(provider_name, provider_instance, api_key, user_id, provider_messages):
+    """Key for llm_response_cache covering everything the provider is sent.
+
+    *user_id* is the chat's owner, so cached replies stay private to one
+    user even when requests share the server's Gemini key. Returns None
+    when the cache is disabled, without hashing the history.
+    """
+    if not llm_response_cache.enabled:
+        return None
+    model = getattr(provider_instance, 'MODEL_NAME', None)
+    return llm_response_cache.make_key(provider_name, model, api_key, user_id, provider_messages)
+
+
+def _provider_class(provider_name):
+    """Return the LLMProvider class for *provider_name*, or None if unknown.
+
+    Providers are imported on first use, so workers that never serve an LLM
+    route don't load the openai / google-genai SDKs.
+    """
+    if provider_name == 'openai':
+        from app.llm_providers.openai_provider import OpenAIProvider
+        return OpenAIProvider
+    if provider_name == 'gemini':
+        from app.llm_providers.gemini_provider import GeminiProvider
+        return GeminiProvider
+    return None
+
+
+def _get_provider(provider_name):
+    """Return the app's shared provider instance for *provider_name*, or None.
+
+    Instances are created on first use and kept in
+    ``app.extensions['llm_providers']``; providers hold no per-request state.
+    """
+    providers = current_app.extensions.setdefault('llm_providers', {})
+    provider = providers.get(provider_name)
+    if provider is None:
+        provider_class = _provider_class(provider_name)
+        if provider_class is None:
+            return None
+        provider = providers.setdefault(provider_name, provider_class())
+    return provider
+
+def _session_messages(session_id, *columns, limit=None, with_owner=False):
+    """Return a chat session's messages oldest first, or 404 if it doesn't exist.
+
+    The messages come from a single SELECT; the session row is only looked
+    up when there are no messages to show that it exists. Pass columns to
+    get plain rows of just those columns instead of ChatMessage objects, and
+    limit to load only the most recent messages. with_owner adds the
+    session's user_id as the last column of each row.
+    """
+    if with_owner:
+        columns += (ChatSession.user_id,)
+    stmt = select(*(columns or (ChatMessage,))).where(ChatMessage.chat_session_id == session_id)
+    if with_owner:
+        stmt = stmt.join(ChatMessage.chat_session)
+    if limit:
+        stmt = stmt.order_by(ChatMessage.timestamp.desc()).limit(limit)
+    else:
+        stmt = stmt.order_by(ChatMessage.timestamp.asc())
+    result = db.session.execute(stmt)
+    messages = result.all() if columns else result.scalars().all()
+    if limit:
+        messages.reverse()
+    if not messages:
+        db.get_or_404(ChatSession, session_id)
+    return messages
+
+def _save_turn(user_message, reply_text=None):
+    """Commit one chat turn and return the saved reply, if any.
+
+    The chat routes keep the user's message in memory while the provider
+    runs and write the turn in a single commit at the end. The user's
+    message is written even when there is no reply (provider error,
+    disconnect), so it is never lost.
+    """
+    db.session.add(user_message)
+    ai_message = None
+    if reply_text is not None:
+        ai_message = ChatMessage(text=reply_text, sender='bot', chat_session_id=user_message.chat_session_id)
+        db.session.add(ai_message)
+    db.session.commit()
+    return ai_message
+
 # Session-Specific Message Routes
 @api.route('/chat_sessions/<int:session_id>/messages', methods=['GET'])
 def get_session_messages(session_id):
-    session = ChatSession.query.get_or_404(session_id)
-    messages = session.messages.order_by(ChatMessage.timestamp.asc()).all()
-    return jsonify([message.to_dict() for message in messages]), 200
+    version = db.session.execute(
+        select(func.count(ChatMessage.id), func.max(ChatMessage.id))
+        .where(ChatMessage.chat_session_id == session_id)
+    ).one()
+    if not version[0]:
+        db.get_or_404(ChatSession, session_id)
+
+    def payload():
+        # The session is known to exist by now, and a zero count means there
+        # is nothing to list
+        if not version[0]:
+            return []
+        rows = db.session.execute(
+            select(*ChatMessage.dict_columns())
+            .where(ChatMessage.chat_session_id == session_id)
+            .order_by(ChatMessage.timestamp.asc())
+        ).all()
+        return [ChatMessage.row_to_dict(row) for row in rows]
+
+    return _versioned_json((session_id, *version, _media_url_epoch()), payload)
 
 @api.route('/chat_sessions/<int:session_id>/messages', methods=['POST'])
 def create_session_message(session_id):
-    ChatSession.query.get_or_404(session_id)
     data = request.get_json()
 
     if not data or not data.get('text') or not data.get('sender'):
@@ -199,7 +522,13 @@ def create_session_message(session_id):
     )
 
     db.session.add(message)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # The chat_session_id foreign key rejects unknown sessions, so there
+        # is no need to look the session up before inserting
+        db.session.rollback()
+        return jsonify({"error": "Session not found"}), 404
 
     return jsonify(message.to_dict()), 201
 
@@ -247,72 +576,149 @@ def respond_llm(session_id):
     if provider_name != 'gemini' and not api_key:
         return jsonify({"error": "api_key is required for this provider"}), 400
 
-    session = ChatSession.query.get_or_404(session_id)
+    provider_instance = _get_provider(provider_name)
+    if provider_instance is None:
+        return jsonify({"error": f"Unknown provider: {provider_name}"}), 400
+
+    # Providers that only send the most recent messages get their history
+    # loaded with a LIMIT instead of fetching the whole conversation. The
+    # reply cache is keyed on the chat's owner, read in the same query.
+    history_rows = _session_messages(session_id, *_HISTORY_COLUMNS, limit=provider_instance.CONTEXT_LIMIT,
+                                     with_owner=llm_response_cache.enabled)
+    owner_id = None
+    if llm_response_cache.enabled:
+        if history_rows:
+            owner_id = history_rows[0].user_id
+        else:
+            # Loaded into the identity map by the 404 check, so no query
+            owner_id = db.session.get(ChatSession, session_id).user_id
     
+    # The user message is saved together with the reply in one commit (see
+    # _save_turn). It is stamped now so it still sorts ahead of the reply.
     user_message = ChatMessage(
         text=user_text,
         sender='user',
         chat_session_id=session_id,
         media_url=media_url,
-        media_type=media_type
+        media_type=media_type,
+        timestamp=datetime.utcnow()
     )
-    db.session.add(user_message)
-    db.session.commit()
 
-    messages_from_db = session.messages.order_by(ChatMessage.timestamp.asc()).all()
-    
-    # Prepare messages differently based on provider
-    provider_messages = []
-    for m in messages_from_db:
-        if provider_name == 'openai':
-            # OpenAI expects role (user/assistant) and content
-            role = 'user' if m.sender == 'user' else 'assistant'
-            msg_dict = {"role": role, "content": m.text or ""}
-            if m.media_url and m.media_type:
-                msg_dict['media_url'] = m.media_url
-                msg_dict['media_type'] = m.media_type
-        else:
-            # Gemini expects sender (user/bot) and text
-            msg_dict = {"sender": m.sender, "text": m.text}
-            if m.media_url and m.media_type:
-                msg_dict['media_url'] = m.media_url
-                msg_dict['media_type'] = m.media_type
-        provider_messages.append(msg_dict)
+    history_rows.append(('user', user_text, media_url, media_type))
 
-    if provider_name == 'openai':
-        provider_instance = OpenAIProvider()
-    elif provider_name == 'gemini':
-        provider_instance = GeminiProvider()
-    else:
-        return jsonify({"error": f"Unknown provider: {provider_name}"}), 400
+    provider_messages = _build_provider_messages(history_rows, provider_name)
 
-    try:
-        ai_response_text = provider_instance.get_response(provider_messages, api_key)
-        
-        if ai_response_text is None or "Error:" in ai_response_text or "blocked by Gemini" in ai_response_text or "Provider error" in ai_response_text:
-             current_app.logger.error(f"Provider {provider_name} returned an error or no content: {ai_response_text}")
-             return jsonify({"error": ai_response_text or f"Provider {provider_name} returned no content or an error."}), 500
+    # Identical requests (retries, resubmitted turns) reuse the last reply
+    # instead of paying for another provider round trip
+    cache_key = _response_cache_key(provider_name, provider_instance, api_key, owner_id, provider_messages)
+    ai_response_text = llm_response_cache.get(cache_key)
 
-    except Exception as e:
-        current_app.logger.error(f"LLM Provider error ({provider_name}): {str(e)}")
-        return jsonify({"error": f"LLM Provider error ({provider_name}): {str(e)}"}), 500
+    if ai_response_text is None:
+        # End the read transaction so the pooled connection isn't held while
+        # the provider works; nothing has been written yet
+        db.session.rollback()
+        try:
+            ai_response_text = provider_instance.get_response(provider_messages, api_key)
 
-    ai_message = ChatMessage(text=ai_response_text, sender='bot', chat_session_id=session_id)
-    db.session.add(ai_message)
-    db.session.commit()
+            if ai_response_text is None or _REPLY_ERROR_RE.search(ai_response_text):
+                 current_app.logger.error("Provider %s returned an error or no content: %s", provider_name, ai_response_text)
+                 _save_turn(user_message)
+                 return jsonify({"error": ai_response_text or f"Provider {provider_name} returned no content or an error."}), 500
+
+        except Exception as e:
+            current_app.logger.error("LLM Provider error (%s): %s", provider_name, e)
+            _save_turn(user_message)
+            return jsonify({"error": f"LLM Provider error ({provider_name}): {str(e)}"}), 500
+
+        llm_response_cache.put(cache_key, ai_response_text)
+
+    ai_message = _save_turn(user_message, ai_response_text)
     return jsonify(ai_message.to_dict()), 200
 
+# Streamed replies are pulled from the provider on their own thread into a
+# small bounded queue, so reading the next tokens overlaps with writing the
+# previous ones to a slow client
+_STREAM_QUEUE_SIZE = 64
+_STREAM_IDLE_TIMEOUT = int(os.getenv('LLM_STREAM_IDLE_TIMEOUT', 120))
+_STREAM_END = object()
+# Tokens arriving within this window are sent as one SSE frame
+_STREAM_COALESCE_WINDOW = int(os.getenv('LLM_STREAM_COALESCE_MS', 2)) / 1000
+_STREAM_COALESCE_MAX = 8
+
+def _pump_chunks(app, chunks, q, stop):
+    """Producer thread body: move provider chunks onto the queue"""
+    with app.app_context():
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    break
+                q.put(chunk)
+        except Exception as e:
+            q.put(e)
+        finally:
+            chunks.close()
+            q.put(_STREAM_END)
+
+def _iter_in_thread(app, chunks):
+    """Iterate a provider stream that is pulled on a background thread.
+
+    Chunks that arrive close together are joined, so this may yield fewer,
+    larger strings than the provider did. Closing this generator, e.g. when
+    the client disconnects, tells the producer to stop and close the
+    provider stream after its current chunk.
+    """
+    q = queue.Queue(maxsize=_STREAM_QUEUE_SIZE)
+    stop = threading.Event()
+    threading.Thread(target=_pump_chunks, args=(app, chunks, q, stop),
+                     name='llm-stream', daemon=True).start()
+    pending = None
+    try:
+        while True:
+            if pending is not None:
+                item, pending = pending, None
+            else:
+                try:
+                    item = q.get(timeout=_STREAM_IDLE_TIMEOUT)
+                except queue.Empty:
+                    raise TimeoutError(f"no output from the provider for {_STREAM_IDLE_TIMEOUT}s")
+            if item is _STREAM_END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            # Slurp tokens that arrive within the coalescing window (or are
+            # already queued behind a slow client) into one frame
+            batch = [item]
+            deadline = time.monotonic() + _STREAM_COALESCE_WINDOW
+            while len(batch) < _STREAM_COALESCE_MAX:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = q.get(timeout=remaining) if remaining > 0 else q.get_nowait()
+                except queue.Empty:
+                    break
+                if not isinstance(item, str):
+                    pending = item
+                    break
+                batch.append(item)
+            yield batch[0] if len(batch) == 1 else "".join(batch)
+    finally:
+        stop.set()
+        # Unblock a producer waiting on a full queue so it can see stop
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                break
+
 @api.route('/chat_sessions/<int:session_id>/respond_llm_stream', methods=['GET'])
 def respond_llm_stream(session_id):
-    session = ChatSession.query.get_or_404(session_id)
+    session = db.get_or_404(ChatSession, session_id)
     provider_name = request.args.get('provider')
     
-    # If provider is specified in request, update the session's provider
-    if provider_name:
-        session.provider = provider_name
-        db.session.commit()
+    # If provider is specified in request, the session's provider is updated
+    # in the same commit as the turn (see save_turn below).
     # Otherwise use the session's saved provider (fallback to openai)
-    else:
+    switch_provider = bool(provider_name) and provider_name != session.provider
+    if not provider_name:
         provider_name = session.provider or 'openai'
     
     api_key = request.args.get('api_key')
@@ -320,7 +726,7 @@ def respond_llm_stream(session_id):
     media_url = request.args.get('media_url')
     media_type = request.args.get('media_type')
     
-    current_app.logger.debug(f"[STREAM DEBUG] Called: session_id={session_id}, provider={provider_name}, has_text={bool(user_text)}, has_media={bool(media_url)}")
+    current_app.logger.debug("[STREAM DEBUG] Called: session_id=%s, provider=%s, has_text=%s, has_media=%s", session_id, provider_name, bool(user_text), bool(media_url))
     
     if not user_text and not media_url:
         return jsonify({"error": "Either text or media content are required"}), 400
@@ -328,82 +734,123 @@ def respond_llm_stream(session_id):
     if provider_name != 'gemini' and not api_key:
         return jsonify({"error": "api_key is required for this provider"}), 400
 
+    provider_instance = _get_provider(provider_name)
+    if provider_instance is None:
+        current_app.logger.error("[STREAM DEBUG] Unsupported provider: %s", provider_name)
+        return jsonify({"error": f"Streaming is not supported for provider: {provider_name}"}), 400
+
+    # The session is already loaded, so the history is read before the user
+    # message is inserted and the new message is appended in memory rather
+    # than read back from the database
+    history_rows = _session_messages(session_id, *_HISTORY_COLUMNS, limit=provider_instance.CONTEXT_LIMIT)
+    current_app.logger.debug("[STREAM DEBUG] Fetched %s messages for provider history.", len(history_rows))
+
     user_message = ChatMessage(
         text=user_text,
         sender='user',
         chat_session_id=session_id,
         media_url=media_url,
-        media_type=media_type
+        media_type=media_type,
+        timestamp=datetime.utcnow()
     )
-    db.session.add(user_message)
-    db.session.commit()
-    current_app.logger.debug(f"[STREAM DEBUG] User message saved: id={user_message.id}")
+    history_rows.append(('user', user_text, media_url, media_type))
 
-    session = ChatSession.query.get_or_404(session_id)
-    messages_from_db = session.messages.order_by(ChatMessage.timestamp.asc()).all()
-    current_app.logger.debug(f"[STREAM DEBUG] Fetched {len(messages_from_db)} messages for provider history.")
-    
-    # Prepare messages differently based on provider
-    provider_messages = []
-    for m in messages_from_db:
-        if provider_name == 'openai':
-            # OpenAI expects role (user/assistant) and content
-            role = 'user' if m.sender == 'user' else 'assistant'
-            msg_dict = {"role": role, "content": m.text or ""}
-            if m.media_url and m.media_type:
-                msg_dict['media_url'] = m.media_url
-                msg_dict['media_type'] = m.media_type
-        else:
-            # Gemini expects sender (user/bot) and text 
-            msg_dict = {"sender": m.sender, "text": m.text}
-            if m.media_url and m.media_type:
-                msg_dict['media_url'] = m.media_url
-                msg_dict['media_type'] = m.media_type
-        provider_messages.append(msg_dict)
+    provider_messages = _build_provider_messages(history_rows, provider_name)
     
-    current_app.logger.debug(f"[STREAM DEBUG] Prepared provider_messages with {len(provider_messages)} entries for {provider_name}")
-
-    if provider_name == 'openai':
-        provider_instance = OpenAIProvider()
-    elif provider_name == 'gemini':
-        provider_instance = GeminiProvider()
-    else:
-        current_app.logger.error(f"[STREAM DEBUG] Unsupported provider: {provider_name}")
-        return jsonify({"error": f"Streaming is not supported for provider: {provider_name}"}), 400
+    current_app.logger.debug("[STREAM DEBUG] Prepared provider_messages with %s entries for %s", len(provider_messages), provider_name)
 
     if not hasattr(provider_instance, 'stream_response'):
-        current_app.logger.error(f"[STREAM DEBUG] Provider {provider_name} does not support streaming method.")
+        current_app.logger.error("[STREAM DEBUG] Provider %s does not support streaming method.", provider_name)
         return jsonify({"error": f"Provider {provider_name} does not have a stream_response method."}), 400
 
+    owner_id = session.user_id
+    # Nothing is written until the turn ends, so the read transaction is
+    # ended here rather than holding a pooled connection for the stream
+    db.session.rollback()
+
+    logger = current_app.logger
+    app = current_app._get_current_object()
+    cache_key = _response_cache_key(provider_name, provider_instance, api_key, owner_id, provider_messages)
+    cached_response = llm_response_cache.get(cache_key)
+
+    def save_turn(reply_text=None):
+        # The user message, the reply and any provider switch go out in
+        # one commit
+        if switch_provider:
+            session.provider = provider_name
+        _save_turn(user_message, reply_text)
+
+    def save_user_message():
+        # A turn without a reply (provider error, timeout, disconnect) still
+        # keeps the user's message
+        try:
+            save_turn()
+        except Exception as e:
+            logger.error("Could not save the user message for session %s: %s", session_id, e)
+            db.session.rollback()
+
     def event_stream():
-        full_response = ""
+        parts = []
+        saved = False
         try:
-            current_app.logger.debug(f"[STREAM DEBUG] Starting stream from {provider_name}...")
-            for chunk_text in provider_instance.stream_response(provider_messages, api_key):
-                if chunk_text: 
-                    full_response += chunk_text
-                    yield f"data: {json.dumps({'delta': chunk_text})}\n\n"
+            if cached_response is not None:
+                # Replayed as a single delta; the client concatenates deltas
+                logger.debug("[STREAM DEBUG] Replaying cached reply for %s", provider_name)
+                parts.append(cached_response)
+                yield _sse_delta(cached_response)
+            else:
+                logger.debug("[STREAM DEBUG] Starting stream from %s...", provider_name)
+                chunks = _iter_in_thread(app, provider_instance.stream_response(provider_messages, api_key))
+                try:
+                    # Providers only yield non-empty text
+                    for chunk_text in chunks:
+                        parts.append(chunk_text)
+                        yield _sse_delta(chunk_text)
+                finally:
+                    # Also runs when the client disconnects and the server
+                    # closes this generator, so the producer thread stops
+                    # pulling tokens for a reply nobody will read
+                    chunks.close()
+            full_response = "".join(parts)
             
-            current_app.logger.debug(f"[STREAM DEBUG] Stream complete from {provider_name}. Full response length: {len(full_response)}")
+            logger.debug("[STREAM DEBUG] Stream complete from %s. Full response length: %s", provider_name, len(full_response))
             
-            if "Error streaming from" in full_response or "Content stream blocked" in full_response or "Error communicating with Gemini" in full_response:
-                 current_app.logger.warning(f"Stream from {provider_name} ended with an error message in content: {full_response}")
+            if _STREAM_ERROR_RE.search(full_response):
+                 logger.warning("Stream from %s ended with an error message in content: %s", provider_name, full_response)
+                 saved = True
+                 save_turn()
             else:
-                ai_message = ChatMessage(text=full_response, sender='bot', chat_session_id=session_id)
-                db.session.add(ai_message)
-                db.session.commit()
-                current_app.logger.debug(f"[STREAM DEBUG] Bot message saved: id={ai_message.id}")
+                saved = True
+                save_turn(full_response)
+                if full_response:
+                    llm_response_cache.put(cache_key, full_response)
+                logger.debug("[STREAM DEBUG] Turn saved for session %s", session_id)
             
-            yield f"data: {json.dumps({'done': True})}\n\n"
+            yield _SSE_DONE
 
         except Exception as e:
-            current_app.logger.error(f"Error during {provider_name} event_stream generation: {str(e)}")
+            logger.error("Error during %s event_stream generation: %s", provider_name, e)
+            db.session.rollback()
+            if not saved:
+                saved = True
+                save_user_message()
             import traceback
             traceback.print_exc()
-            yield f"data: {json.dumps({'error': f'Stream generation error with {provider_name}: {str(e)}'})}\n\n"
-            yield f"data: {json.dumps({'done': True})}\n\n"
+            yield _sse_frame({'error': f'Stream generation error with {provider_name}: {str(e)}'})
+            yield _SSE_DONE
+        finally:
+            # A client disconnect closes this generator mid-stream
+            if not saved:
+                save_user_message()
 
-    return Response(stream_with_context(event_stream()), mimetype='text/event-stream')
+    # Without these, nginx buffers the proxied body and the browser only sees
+    # the stream once the whole LLM turn has finished
+    return Response(
+        stream_with_context(event_stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        direct_passthrough=True
+    )
 
 # File upload endpoint
 @api.route('/uploads', methods=['POST'])
@@ -452,20 +899,76 @@ def upload_file():
 # INTERACTION LOGGING ENDPOINTS
 # ===========================
 
+def _background_gcs_upload(app, interaction_id, media_data_record_id, decoded_data, file_extension,
+                           content_type, interaction_type, session_id):
+    """Upload already-decoded media to GCS on an upload-pool thread.
+
+    Runs inside a single app context for the whole job, including the
+    hash-only fallback when the upload fails.
+    """
+    logger = app.logger
+    with app.app_context():
+        try:
+            bg_media_data = db.session.get(InteractionMediaData, media_data_record_id)
+            if not bg_media_data:
+                logger.error("Background upload: Media data %s not found", media_data_record_id)
+                return
+            
+            logger.info("Starting background upload for interaction %s", interaction_id)
+            
+            if decoded_data:
+                # Create filename and upload
+                timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+                session_short = session_id[-8:]
+                filename = f"interactions/{timestamp}_{session_short}_{interaction_type}_{interaction_id}.{file_extension}"
+                
+                temp_file = BytesIO(decoded_data)
+                temp_file.name = filename
+                temp_file.content_type = content_type
+                
+                # Upload to GCS with extended expiration for replay data
+                gcs_url, _ = GCSStorageService.upload_file(temp_file, filename, expiration_hours=168)
+                
+                # Update database with final URL
+                bg_media_data.cloud_storage_url = gcs_url
+                db.session.commit()
+                
+                logger.info("Background upload completed: %s -> %.100s...", filename, gcs_url)
+            
+        except Exception as gcs_error:
+            logger.error("Background GCS upload failed for interaction %s: %s", interaction_id, gcs_error)
+            # Update database to reflect failure (keep hash-only)
+            try:
+                db.session.rollback()
+                bg_media_data = db.session.get(InteractionMediaData, media_data_record_id)
+                if bg_media_data:
+                    bg_media_data.storage_type = 'hash_only'
+                    bg_media_data.cloud_storage_url = None
+                    db.session.commit()
+                    logger.info("Fallback: Set interaction %s to hash-only after upload failure", interaction_id)
+            except Exception as db_error:
+                logger.error("Failed to update database after upload failure: %s", db_error)
+
 @api.route('/interaction-logs', methods=['POST'])
 @require_auth
 def log_interaction():
     """Log a user interaction with optional media data"""
+    logger = current_app.logger
     try:
         # Get the current authenticated user
         user = auth_service.get_current_user()
         if not user:
             return jsonify({"error": "User not found"}), 401
             
-        data = request.get_json()
+        # Media payloads make these bodies large; parse the raw bytes once
+        # with orjson rather than caching both the body and Werkzeug's parse
+        try:
+            data = orjson.loads(request.get_data(cache=False))
+        except orjson.JSONDecodeError:
+            data = None
         
         # Validate required fields
-        if not data or not data.get('session_id') or not data.get('interaction_type'):
+        if not isinstance(data, dict) or not data.get('session_id') or not data.get('interaction_type'):
             return jsonify({"error": "session_id and interaction_type are required"}), 400
         
         # Extract user context from request
@@ -480,14 +983,14 @@ def log_interaction():
                 # Parse frontend timestamp (ISO format)
                 parsed_timestamp = datetime.fromisoformat(frontend_timestamp.replace('Z', '+00:00'))
                 interaction_timestamp = parsed_timestamp.replace(tzinfo=None)  # Remove timezone for SQLite compatibility
-                current_app.logger.info(f"Using frontend timestamp: {frontend_timestamp} -> {interaction_timestamp}")
+                logger.info("Using frontend timestamp: %s -> %s", frontend_timestamp, interaction_timestamp)
             except (ValueError, AttributeError) as e:
                 # Fallback to current time if parsing fails
                 interaction_timestamp = datetime.utcnow()
-                current_app.logger.warning(f"Failed to parse frontend timestamp '{frontend_timestamp}': {e}")
+                logger.warning("Failed to parse frontend timestamp '%s': %s", frontend_timestamp, e)
         else:
             interaction_timestamp = datetime.utcnow()
-            current_app.logger.debug("No frontend timestamp provided, using current time")
+            logger.debug("No frontend timestamp provided, using current time")
         
         # Create main interaction log with user_id
         interaction_log = InteractionLog(
@@ -505,38 +1008,21 @@ def log_interaction():
         
         # Add metadata if provided
         if metadata_data:
-            # Prepare custom metadata from any non-standard fields
-            custom_metadata = {}
-            standard_fields = {
-                'frame_rate', 'audio_sample_rate', 'video_resolution', 'audio_format', 
-                'video_format', 'compression_quality', 'data_size_bytes', 'processing_time_ms',
-                'api_endpoint', 'api_response_time_ms', 'api_status_code', 'camera_on', 
-                'microphone_on', 'is_connected', 'timestamp', 'frontend_logged_at'
+            # Known fields map straight onto columns; anything else is kept
+            # in custom_metadata
+            columns = {key: metadata_data.get(key) for key in _METADATA_COLUMNS}
+            resolution = metadata_data.get('video_resolution') or {}
+            custom_metadata = {
+                key: value for key, value in metadata_data.items()
+                if key not in _STANDARD_METADATA_FIELDS
             }
             
-            # Store any additional fields in custom_metadata
-            for key, value in metadata_data.items():
-                if key not in standard_fields:
-                    custom_metadata[key] = value
-            
             interaction_metadata = InteractionMetadata(
                 interaction_log_id=interaction_log.id,
-                frame_rate=metadata_data.get('frame_rate'),
-                audio_sample_rate=metadata_data.get('audio_sample_rate'),
-                video_resolution_width=metadata_data.get('video_resolution', {}).get('width'),
-                video_resolution_height=metadata_data.get('video_resolution', {}).get('height'),
-                audio_format=metadata_data.get('audio_format'),
-                video_format=metadata_data.get('video_format'),
-                compression_quality=metadata_data.get('compression_quality'),
-                data_size_bytes=metadata_data.get('data_size_bytes'),
-                processing_time_ms=metadata_data.get('processing_time_ms'),
-                api_endpoint=metadata_data.get('api_endpoint'),
-                api_response_time_ms=metadata_data.get('api_response_time_ms'),
-                api_status_code=metadata_data.get('api_status_code'),
-                camera_on=metadata_data.get('camera_on'),
-                microphone_on=metadata_data.get('microphone_on'),
-                is_connected=metadata_data.get('is_connected'),
-                custom_metadata=custom_metadata if custom_metadata else None
+                video_resolution_width=resolution.get('width'),
+                video_resolution_height=resolution.get('height'),
+                custom_metadata=custom_metadata or None,
+                **columns
             )
             db.session.add(interaction_metadata)
         
@@ -557,59 +1043,21 @@ def log_interaction():
                 retention_until=datetime.utcnow() + timedelta(days=media_data_info.get('retention_days', 7))
             )
             
+            # Upload pool is saturated: keep the hash but skip the upload
+            if storage_type == 'cloud_storage' and not _upload_capacity_available():
+                logger.warning("Upload backlog at %d, storing %s as hash-only", MAX_PENDING_UPLOADS, interaction_type)
+                storage_type = 'hash_only'
+                media_data_record.storage_type = storage_type
+            
             # Fast path: immediate database storage with background upload
             if (storage_type == 'cloud_storage') and 'data' in media_data_info:
                 # Generate hash immediately for database
                 if isinstance(media_data_info['data'], str):
                     try:
-                        # Process data for hash generation
-                        if interaction_type == 'api_response':
-                            try:
-                                json_data = json.loads(media_data_info['data'])
-                                if isinstance(json_data, dict) and 'data' in json_data:
-                                    base64_data = json_data['data']
-                                    missing_padding = len(base64_data) % 4
-                                    if missing_padding != 0:
-                                        base64_data += '=' * (4 - missing_padding)
-                                    decoded_data = base64.b64decode(base64_data)
-                                    file_extension = 'pcm'
-                                    content_type = json_data.get('mimeType', 'audio/pcm')
-                                else:
-                                    decoded_data = media_data_info['data'].encode('utf-8')
-                                    file_extension = 'json'
-                                    content_type = 'application/json'
-                            except Exception:
-                                # Check if this looks like base64 encoded audio data
-                                try:
-                                    base64_data = media_data_info['data']
-                                    # If it's very long and looks like base64, it's probably audio
-                                    if len(base64_data) > 1000 and all(c in 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=' for c in base64_data[:100]):
-                                        missing_padding = len(base64_data) % 4
-                                        if missing_padding != 0:
-                                            base64_data += '=' * (4 - missing_padding)
-                                        decoded_data = base64.b64decode(base64_data)
-                                        file_extension = 'pcm'
-                                        content_type = 'audio/pcm'
-                                    else:
-                                        # Short content or not base64-like, treat as text
-                                        decoded_data = media_data_info['data'].encode('utf-8')
-                                        file_extension = 'txt'
-                                        content_type = 'text/plain'
-                                except Exception:
-                                    # Final fallback: treat as text
-                                    decoded_data = media_data_info['data'].encode('utf-8')
-                                    file_extension = 'txt'
-                                    content_type = 'text/plain'
-                        else:
-                            # For audio/video chunks
-                            try:
-                                base64_data = media_data_info['data']
-                                missing_padding = len(base64_data) % 4
-                                if missing_padding != 0:
-                                    base64_data += '=' * (4 - missing_padding)
-                                decoded_data = base64.b64decode(base64_data)
-                            except Exception:
-                                decoded_data = media_data_info['data'].encode('utf-8')
+                        # Decode once; the background upload reuses these bytes
+                        decoded_data, file_extension, content_type = _decode_interaction_media(
+                            interaction_type, media_data_info['data']
+                        )
                         
                         # Store hash immediately
                         media_data_record.data_hash = hashlib.sha256(decoded_data).hexdigest()
@@ -618,7 +1066,7 @@ def log_interaction():
                         media_data_record.cloud_storage_url = f"pending_upload_{interaction_log.id}"
                         background_upload_needed = True
                         
-                        current_app.logger.info(f"Queued {interaction_type} for background upload (size: {len(decoded_data)} bytes)")
+                        logger.info("Queued %s for background upload (size: %d bytes)", interaction_type, len(decoded_data))
                         
                         # 🚨 TEMPORARY FIX: Disable background uploads until GCS threading is fixed 🚨
                         # Force all storage to hash-only mode to ensure replay works
@@ -629,7 +1077,7 @@ def log_interaction():
                         # current_app.logger.info(f"Stored {interaction_type} as hash-only (background upload disabled)")
                         
                     except Exception as e:
-                        current_app.logger.error(f"Error processing media data: {str(e)}")
+                        logger.error("Error processing media data: %s", e)
                         # Fallback to hash-only
                         media_data_record.storage_type = 'hash_only'
                         if 'data' in media_data_info:
@@ -667,140 +1115,17 @@ def log_interaction():
         
         # 🚨 BACKGROUND UPLOAD PROCESSING 🚨
         if background_upload_needed and media_data_record:
-            # Use threading to handle upload asynchronously
-            import threading
-            
-            # Get the real Flask app object BEFORE starting the thread
+            # Get the real Flask app object BEFORE handing off to the upload pool
             app_obj = current_app._get_current_object()
             
-            def background_gcs_upload(app, interaction_id, media_data_record_id, media_data_info, interaction_type, session_id):
-                """Background function to handle GCS upload"""
-                try:
-                    # Use the passed Flask app object in background thread
-                    with app.app_context():
-                        # Get fresh database session for background thread
-                        from app import db as bg_db
-                        from app.models import InteractionMediaData as BgInteractionMediaData
-                        
-                        bg_media_data = bg_db.session.get(BgInteractionMediaData, media_data_record_id)
-                        if not bg_media_data:
-                            app.logger.error(f"Background upload: Media data {media_data_record_id} not found")
-                            return
-                        
-                        app.logger.info(f"Starting background upload for interaction {interaction_id}")
-                        
-                        # Recreate the upload data
-                        decoded_data = None
-                        if interaction_type == 'api_response':
-                            try:
-                                json_data = json.loads(media_data_info['data'])
-                                if isinstance(json_data, dict) and 'data' in json_data:
-                                    base64_data = json_data['data']
-                                    missing_padding = len(base64_data) % 4
-                                    if missing_padding != 0:
-                                        base64_data += '=' * (4 - missing_padding)
-                                    decoded_data = base64.b64decode(base64_data)
-                                    file_extension = 'pcm'
-                                    content_type = json_data.get('mimeType', 'audio/pcm')
-                                else:
-                                    decoded_data = media_data_info['data'].encode('utf-8')
-                                    file_extension = 'json'
-                                    content_type = 'application/json'
-                            except Exception:
-                                # Check if this looks like base64 encoded audio data
-                                try:
-                                    base64_data = media_data_info['data']
-                                    # If it's very long and looks like base64, it's probably audio
-                                    if len(base64_data) > 1000 and all(c in 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=' for c in base64_data[:100]):
-                                        missing_padding = len(base64_data) % 4
-                                        if missing_padding != 0:
-                                            base64_data += '=' * (4 - missing_padding)
-                                        decoded_data = base64.b64decode(base64_data)
-                                        file_extension = 'pcm'
-                                        content_type = 'audio/pcm'
-                                    else:
-                                        # Short content or not base64-like, treat as text
-                                        decoded_data = media_data_info['data'].encode('utf-8')
-                                        file_extension = 'txt'
-                                        content_type = 'text/plain'
-                                except Exception:
-                                    # Final fallback: treat as text
-                                    decoded_data = media_data_info['data'].encode('utf-8')
-                                    file_extension = 'txt'
-                                    content_type = 'text/plain'
-                        elif interaction_type == 'text_input':
-                            # Text input is always plain text - don't try to base64 decode
-                            decoded_data = media_data_info['data'].encode('utf-8')
-                            file_extension = 'txt'
-                            content_type = 'text/plain'
-                        else:
-                            try:
-                                base64_data = media_data_info['data']
-                                missing_padding = len(base64_data) % 4
-                                if missing_padding != 0:
-                                    base64_data += '=' * (4 - missing_padding)
-                                decoded_data = base64.b64decode(base64_data)
-                                
-                                if interaction_type == 'audio_chunk':
-                                    file_extension = 'pcm'
-                                    content_type = 'audio/pcm'
-                                elif interaction_type == 'video_frame':
-                                    file_extension = 'jpg'
-                                    content_type = 'image/jpeg'
-                                else:
-                                    file_extension = 'bin'
-                                    content_type = 'application/octet-stream'
-                            except Exception:
-                                decoded_data = media_data_info['data'].encode('utf-8')
-                                file_extension = 'txt'
-                                content_type = 'text/plain'
-                        
-                        if decoded_data:
-                            # Create filename and upload
-                            timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-                            session_short = session_id[-8:]
-                            filename = f"interactions/{timestamp}_{session_short}_{interaction_type}_{interaction_id}.{file_extension}"
-                            
-                            temp_file = BytesIO(decoded_data)
-                            temp_file.name = filename
-                            temp_file.content_type = content_type
-                            
-                            # Upload to GCS with extended expiration for replay data
-                            gcs_url, _ = GCSStorageService.upload_file(temp_file, filename, expiration_hours=168)
-                            
-                            # Update database with final URL
-                            bg_media_data.cloud_storage_url = gcs_url
-                            bg_db.session.commit()
-                            
-                            app.logger.info(f"Background upload completed: {filename} -> {gcs_url[:100]}...")
-                        
-                except Exception as gcs_error:
-                    app.logger.error(f"Background GCS upload failed for interaction {interaction_id}: {str(gcs_error)}")
-                    # Update database to reflect failure (keep hash-only)
-                    try:
-                        with app.app_context():
-                            from app import db as bg_db
-                            from app.models import InteractionMediaData as BgInteractionMediaData
-                            
-                            bg_media_data = bg_db.session.get(BgInteractionMediaData, media_data_record_id)
-                            if bg_media_data:
-                                bg_media_data.storage_type = 'hash_only'
-                                bg_media_data.cloud_storage_url = None
-                                bg_db.session.commit()
-                                app.logger.info(f"Fallback: Set interaction {interaction_id} to hash-only after upload failure")
-                    except Exception as db_error:
-                        # If we can't even access the app context here, just log the error
-                        app.logger.error(f"Failed to update database after upload failure: {str(db_error)}")
-            
             # Start background upload with all necessary parameters
-            upload_thread = threading.Thread(
-                target=background_gcs_upload, 
-                args=(app_obj, interaction_id, media_data_record.id, media_data_info, interaction_type, data['session_id']),
-                daemon=True
+            _submit_upload(
+                _background_gcs_upload,
+                app_obj, interaction_id, media_data_record.id, decoded_data, file_extension,
+                content_type, interaction_type, data['session_id']
             )
-            upload_thread.start()
             
-            current_app.logger.info(f"Started background upload thread for interaction {interaction_id}")
+            logger.info("Queued background upload for interaction %s", interaction_id)
         
         # Update session summary (quick operation)
         _update_session_summary(data['session_id'], data['interaction_type'], metadata_data, user.id)
@@ -814,7 +1139,7 @@ def log_interaction():
         
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error logging interaction: {str(e)}")
+        logger.error("Error logging interaction: %s", e)
         return jsonify({"error": f"Failed to log interaction: {str(e)}"}), 500
 
 @api.route('/interaction-logs/<session_id>', methods=['GET'])
@@ -857,7 +1182,7 @@ def get_interaction_logs(session_id):
         }), 200
         
     except Exception as e:
-        current_app.logger.error(f"Error retrieving interaction logs: {str(e)}")
+        current_app.logger.error("Error retrieving interaction logs: %s", e)
         return jsonify({"error": f"Failed to retrieve logs: {str(e)}"}), 500
 
 @api.route('/interaction-logs/analytics/<session_id>', methods=['GET'])
@@ -911,7 +1236,7 @@ def get_session_analytics(session_id):
         }), 200
         
     except Exception as e:
-        current_app.logger.error(f"Error getting session analytics: {str(e)}")
+        current_app.logger.error("Error getting session analytics: %s", e)
         return jsonify({"error": f"Failed to get analytics: {str(e)}"}), 500
 
 @api.route('/interaction-logs/sessions', methods=['GET'])
@@ -937,7 +1262,7 @@ def get_interaction_sessions():
         }), 200
         
     except Exception as e:
-        current_app.logger.error(f"Error getting interaction sessions: {str(e)}")
+        current_app.logger.error("Error getting interaction sessions: %s", e)
         return jsonify({"error": f"Failed to get sessions: {str(e)}"}), 500
 
 @api.route('/interaction-logs/session/<session_id>/start', methods=['POST'])
@@ -1003,7 +1328,7 @@ def start_interaction_session(session_id):
         
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error starting session: {str(e)}")
+        current_app.logger.error("Error starting session: %s", e)
         return jsonify({"error": f"Failed to start session: {str(e)}"}), 500
 
 @api.route('/interaction-logs/session/<session_id>/end', methods=['POST'])
@@ -1039,7 +1364,7 @@ def end_interaction_session(session_id):
         
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error ending session: {str(e)}")
+        current_app.logger.error("Error ending session: %s", e)
         return jsonify({"error": f"Failed to end session: {str(e)}"}), 500
 
 def _update_session_summary(session_id, interaction_type, metadata, user_id=None):
@@ -1096,16 +1421,53 @@ def _update_session_summary(session_id, interaction_type, metadata, user_id=None
         db.session.commit()
         
     except Exception as e:
-        current_app.logger.error(f"Error updating session summary: {str(e)}")
+        current_app.logger.error("Error updating session summary: %s", e)
         # Don't fail the main request if summary update fails
         db.session.rollback() 
 
+_TEXT_CONTENT_TYPE = 'text/plain; charset=utf-8'
+
+# Content-Type for replayed media, by interaction type
+_REPLAY_CONTENT_TYPES = {
+    'audio_chunk': 'audio/pcm',
+    'video_frame': 'image/jpeg',
+    'text_input': _TEXT_CONTENT_TYPE,
+}
+# api_response media is typed by the extension it was stored under
+_API_RESPONSE_CONTENT_TYPES = {
+    '.pcm': 'audio/pcm',
+    '.json': 'application/json',
+    '.txt': _TEXT_CONTENT_TYPE,
+}
+
+def _media_content_type(interaction_log, content, path=None):
+    """Pick the Content-Type for replayed media.
+
+    path is the storage URL or blob path for cloud media, or None for inline
+    data; api_response media without a known extension is sniffed by size.
+    """
+    interaction_type = interaction_log.interaction_type
+    if interaction_type != 'api_response':
+        return _REPLAY_CONTENT_TYPES.get(interaction_type, 'application/octet-stream')
+    if path is None:
+        # Inline API responses: large payloads are audio, small ones text
+        return 'audio/pcm' if len(content) > 1000 else _TEXT_CONTENT_TYPE
+    extension = os.path.splitext(path.split('?', 1)[0])[1]
+    content_type = _API_RESPONSE_CONTENT_TYPES.get(extension)
+    if content_type:
+        return content_type
+    metadata = interaction_log.interaction_metadata
+    if len(content) > 1000 and metadata and metadata.api_endpoint == 'gemini_live_api':
+        return 'audio/pcm'
+    # Default for small API responses is likely text
+    return _TEXT_CONTENT_TYPE
+
 @api.route('/interaction-logs/media/<int:interaction_id>', methods=['GET'])
 def get_interaction_media(interaction_id):
     """Proxy media files from cloud storage to avoid CORS issues"""
     try:
         # Find the interaction log
-        interaction_log = InteractionLog.query.get(interaction_id)
+        interaction_log = db.session.get(InteractionLog, interaction_id)
         if not interaction_log:
             return jsonify({"error": "Interaction not found"}), 404
         
@@ -1122,30 +1484,7 @@ def get_interaction_media(interaction_id):
                 gcs_response = requests.get(media_data.cloud_storage_url, timeout=30)
                 
                 if gcs_response.status_code == 200:
-                    # Determine content type based on interaction type
-                    content_type = 'application/octet-stream'  # Default
-                    if interaction_log.interaction_type == 'audio_chunk':
-                        content_type = 'audio/pcm'
-                    elif interaction_log.interaction_type == 'video_frame':
-                        content_type = 'image/jpeg'
-                    elif interaction_log.interaction_type == 'text_input':
-                        # Text input should always be text/plain
-                        content_type = 'text/plain; charset=utf-8'
-                    elif interaction_log.interaction_type == 'api_response':
-                        # Check if it's audio, JSON, or text
-                        if media_data.cloud_storage_url.endswith('.pcm'):
-                            content_type = 'audio/pcm'
-                        elif media_data.cloud_storage_url.endswith('.json'):
-                            content_type = 'application/json'
-                        elif media_data.cloud_storage_url.endswith('.txt'):
-                            content_type = 'text/plain; charset=utf-8'
-                        else:
-                            # For API responses, check if it looks like audio data
-                            if len(gcs_response.content) > 1000 and interaction_log.interaction_metadata and interaction_log.interaction_metadata.api_endpoint == 'gemini_live_api':
-                                content_type = 'audio/pcm'
-                            else:
-                                # Default for small API responses is likely text
-                                content_type = 'text/plain; charset=utf-8'
+                    content_type = _media_content_type(interaction_log, gcs_response.content, media_data.cloud_storage_url)
                     
                     # Return the file content with proper headers
                     response = Response(
@@ -1160,7 +1499,7 @@ def get_interaction_media(interaction_id):
                     return response
                 elif gcs_response.status_code in [400, 403]:
                     # URL likely expired - try to regenerate it
-                    current_app.logger.warning(f"GCS URL expired for interaction {interaction_id}, attempting regeneration")
+                    current_app.logger.warning("GCS URL expired for interaction %s, attempting regeneration", interaction_id)
                     
                     try:
                         # Extract blob name from the URL
@@ -1176,33 +1515,13 @@ def get_interaction_media(interaction_id):
                         media_data.cloud_storage_url = new_signed_url
                         db.session.commit()
                         
-                        current_app.logger.info(f"Successfully regenerated URL for interaction {interaction_id}")
+                        current_app.logger.info("Successfully regenerated URL for interaction %s", interaction_id)
                         
                         # Try fetching with the new URL
                         gcs_response = requests.get(new_signed_url, timeout=30)
                         
                         if gcs_response.status_code == 200:
-                            # Determine content type
-                            content_type = 'application/octet-stream'
-                            if interaction_log.interaction_type == 'audio_chunk':
-                                content_type = 'audio/pcm'
-                            elif interaction_log.interaction_type == 'video_frame':
-                                content_type = 'image/jpeg'
-                            elif interaction_log.interaction_type == 'text_input':
-                                content_type = 'text/plain; charset=utf-8'
-                            elif interaction_log.interaction_type == 'api_response':
-                                if blob_path.endswith('.pcm'):
-                                    content_type = 'audio/pcm'
-                                elif blob_path.endswith('.json'):
-                                    content_type = 'application/json'
-                                elif blob_path.endswith('.txt'):
-                                    content_type = 'text/plain; charset=utf-8'
-                                else:
-                                    if len(gcs_response.content) > 1000 and interaction_log.interaction_metadata and interaction_log.interaction_metadata.api_endpoint == 'gemini_live_api':
-                                        content_type = 'audio/pcm'
-                                    else:
-                                        # Default for small API responses is likely text
-                                        content_type = 'text/plain; charset=utf-8'
+                            content_type = _media_content_type(interaction_log, gcs_response.content, blob_path)
                             
                             response = Response(
                                 gcs_response.content,
@@ -1216,35 +1535,23 @@ def get_interaction_media(interaction_id):
                             )
                             return response
                         else:
-                            current_app.logger.error(f"New URL also failed for interaction {interaction_id}: {gcs_response.status_code}")
+                            current_app.logger.error("New URL also failed for interaction %s: %s", interaction_id, gcs_response.status_code)
                             return jsonify({"error": "Failed to fetch from regenerated cloud storage URL"}), 502
                             
                     except Exception as regen_error:
-                        current_app.logger.error(f"URL regeneration failed for interaction {interaction_id}: {str(regen_error)}")
+                        current_app.logger.error("URL regeneration failed for interaction %s: %s", interaction_id, regen_error)
                         return jsonify({"error": f"URL expired and regeneration failed: {str(regen_error)}"}), 502
                 else:
-                    current_app.logger.error(f"GCS fetch failed: {gcs_response.status_code}")
+                    current_app.logger.error("GCS fetch failed: %s", gcs_response.status_code)
                     return jsonify({"error": "Failed to fetch from cloud storage"}), 502
                     
             except Exception as e:
-                current_app.logger.error(f"Error fetching from GCS: {str(e)}")
+                current_app.logger.error("Error fetching from GCS: %s", e)
                 return jsonify({"error": f"Cloud storage error: {str(e)}"}), 502
         
         elif media_data.storage_type == 'inline' and media_data.data_inline:
             # Return inline data
-            content_type = 'application/octet-stream'
-            if interaction_log.interaction_type == 'audio_chunk':
-                content_type = 'audio/pcm'
-            elif interaction_log.interaction_type == 'video_frame':
-                content_type = 'image/jpeg'
-            elif interaction_log.interaction_type == 'text_input':
-                content_type = 'text/plain; charset=utf-8'
-            elif interaction_log.interaction_type == 'api_response':
-                # For inline API responses, assume text unless it's clearly audio
-                if len(media_data.data_inline) > 1000:
-                    content_type = 'audio/pcm'  # Large responses likely audio
-                else:
-                    content_type = 'text/plain; charset=utf-8'  # Small responses likely text
+            content_type = _media_content_type(interaction_log, media_data.data_inline)
             
             response = Response(
                 media_data.data_inline,
@@ -1264,7 +1571,7 @@ def get_interaction_media(interaction_id):
             return jsonify({"error": "Unsupported storage type or no media URL"}), 404
             
     except Exception as e:
-        current_app.logger.error(f"Error retrieving interaction media: {str(e)}")
+        current_app.logger.error("Error retrieving interaction media: %s", e)
         return jsonify({"error": f"Failed to retrieve media: {str(e)}"}), 500 
 
 @api.route('/interaction-logs/regenerate-urls/<session_id>', methods=['POST'])
@@ -1298,7 +1605,7 @@ def regenerate_session_urls(session_id):
                     interaction.media_data.cloud_storage_url = new_url
                     regenerated_count += 1
                     
-                    current_app.logger.info(f"Regenerated URL for interaction {interaction.id}")
+                    current_app.logger.info("Regenerated URL for interaction %s", interaction.id)
                     
                 except Exception as e:
                     failed_count += 1
@@ -1319,7 +1626,7 @@ def regenerate_session_urls(session_id):
         
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error regenerating URLs for session {session_id}: {str(e)}")
+        current_app.logger.error("Error regenerating URLs for session %s: %s", session_id, e)
         return jsonify({"error": f"Failed to regenerate URLs: {str(e)}"}), 500 
 
 @api.route('/interaction-logs/recover-uploads/<session_id>', methods=['POST'])
@@ -1348,14 +1655,14 @@ def recover_failed_uploads(session_id):
             try:
                 media_data = interaction.media_data
                 
-                current_app.logger.info(f"Attempting to recover upload for interaction {interaction.id}")
+                current_app.logger.info("Attempting to recover upload for interaction %s", interaction.id)
                 
                 # Set storage to hash-only for now (immediate fix)
                 media_data.storage_type = 'hash_only'
                 media_data.cloud_storage_url = None
                 
                 recovered_count += 1
-                current_app.logger.info(f"Recovered interaction {interaction.id} by switching to hash-only storage")
+                current_app.logger.info("Recovered interaction %s by switching to hash-only storage", interaction.id)
                 
             except Exception as e:
                 failed_count += 1
@@ -1376,7 +1683,7 @@ def recover_failed_uploads(session_id):
         
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error recovering uploads for session {session_id}: {str(e)}")
+        current_app.logger.error("Error recovering uploads for session %s: %s", session_id, e)
         return jsonify({"error": f"Failed to recover uploads: {str(e)}"}), 500 
 
 # --- Live API: Ephemeral Token Endpoint ------------------------------------
@@ -1391,16 +1698,15 @@ def get_ephemeral_token():
     issuance (configurable below).
     """
     try:
-        from google import genai  # Local import to avoid slowing cold starts if library missing
-        import os
+        from app.llm_providers.gemini_provider import get_api_key, get_client
         from datetime import datetime, timedelta, timezone
 
-        api_key = os.getenv("REACT_APP_GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY")
+        api_key = get_api_key()
         if not api_key:
             return jsonify({"error": "Server misconfiguration: missing GEMINI API key"}), 500
 
-        # Create client targeting v1alpha (AuthToken service available here)
-        client = genai.Client(api_key=api_key, http_options={'api_version': 'v1alpha'})
+        # Cached client targeting v1alpha (AuthToken service available here)
+        client = get_client(api_key, for_live=True)
 
         now = datetime.now(tz=timezone.utc)
         token = client.auth_tokens.create(
@@ -33,6 +33,11 @@ class Config:
     GEMINI_DEFAULT_MODEL = os.environ.get('GEMINI_DEFAULT_MODEL', 'gemini-2.5-flash')
     ENABLE_LEGACY_MODEL = os.environ.get('ENABLE_LEGACY_MODEL', 'false').lower() in {'1', 'true', 'yes'}
     
+    # Session video export endpoints (video_creation blueprint). Off by
+    # default: they pull in the GCS/ffmpeg video processor, which API-only
+    # deployments don't need at startup.
+    ENABLE_VIDEO_CREATION = os.environ.get('ENABLE_VIDEO_CREATION', 'false').lower() in {'1', 'true', 'yes'}
+    
     # Set GOOGLE_APPLICATION_CREDENTIALS in environment or configure here
     # Example: 
     # os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = '/path/to/service-account-key.json'
@@ -0,0 +1,46 @@
+"""
+orjson-backed JSON provider
+===========================
+
+Swaps Flask's stdlib ``json`` encoder for orjson's C implementation so every
+``jsonify``/``request.get_json`` call goes through the faster codec.
+"""
+
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+# Dates and datetimes are passed through to Flask's default hook so they keep
+# Flask's HTTP-date format rather than orjson's RFC 3339
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson.
+
+    Output decodes to the same values as DefaultJSONProvider's (it is just
+    compact, with non-ASCII text sent as UTF-8 rather than escaped): keys
+    are sorted when ``sort_keys`` is set, and dates, Decimal, objects with
+    ``__html__``, ... are handed to Flask's default hook. Calls that pass stdlib-only keyword
+    arguments (``indent``, ``cls``, ...) fall back to the default provider.
+    """
+
+    def _options(self):
+        if self.sort_keys:
+            return _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS
+        return _ORJSON_OPTIONS
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # orjson already returns bytes; skip the str round-trip
+        body = orjson.dumps(obj, default=self.default, option=self._options())
+        return self._app.response_class(body, mimetype=self.mimetype)
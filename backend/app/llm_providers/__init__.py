@@ -1,2 +1,15 @@
-from .openai_provider import OpenAIProvider
-from .gemini_provider import GeminiProvider 
\ No newline at end of file
+# Providers are imported on first access so that importing this package
+# doesn't load the openai / google-genai SDKs
+_PROVIDERS = {
+    'OpenAIProvider': '.openai_provider',
+    'GeminiProvider': '.gemini_provider',
+}
+
+__all__ = list(_PROVIDERS)
+
+
+def __getattr__(name):
+    if name in _PROVIDERS:
+        from importlib import import_module
+        return getattr(import_module(_PROVIDERS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
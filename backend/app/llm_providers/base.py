@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
 
 class LLMProvider(ABC):
+    # Number of most recent messages the provider sends as context, or None
+    # if it sends the whole conversation
+    CONTEXT_LIMIT = None
+
     @abstractmethod
     def get_response(self, messages, api_key, **kwargs):
         """
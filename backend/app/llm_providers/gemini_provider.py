@@ -1,6 +1,9 @@
 from google import genai
 from google.genai import types  # For tool definitions (Google Search grounding)
 import os
+import hashlib
+import threading
+from collections import OrderedDict
 import requests
 from io import BytesIO
 from .base import LLMProvider
@@ -15,6 +18,50 @@ import logging as _logging
 # ---------------------------------------------------------------------------
 _GEMINI_FILE_CACHE: dict[tuple[str, str], str] = {}
 
+# ---------------------------------------------------------------------------
+# genai.Client instances are reused per (API key, API version) so each request
+# doesn't rebuild the client and its HTTP connection pool. Keys are stored
+# hashed, and the cache is a small LRU since only a handful of keys are ever
+# in play.
+# ---------------------------------------------------------------------------
+_GEMINI_CLIENT_CACHE_SIZE = 16
+_GEMINI_CLIENT_CACHE: "OrderedDict[tuple[str, bool], genai.Client]" = OrderedDict()
+_GEMINI_CLIENT_LOCK = threading.Lock()
+
+# Server-side key, read once per worker process. The container gets it from
+# .env as REACT_APP_GEMINI_API_KEY; GEMINI_API_KEY is accepted as well.
+_SERVER_API_KEY = os.getenv("REACT_APP_GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY")
+
+
+def get_api_key():
+    """Return the server's Gemini API key, or None if it isn't configured."""
+    return _SERVER_API_KEY
+
+
+def get_client(api_key, for_live=False):
+    """Return a cached genai.Client for *api_key*.
+
+    ``for_live`` selects the v1alpha API version needed by the Live API and
+    its AuthToken service.
+    """
+    cache_key = (hashlib.sha256(api_key.encode()).hexdigest(), for_live)
+    with _GEMINI_CLIENT_LOCK:
+        client = _GEMINI_CLIENT_CACHE.get(cache_key)
+        if client is not None:
+            _GEMINI_CLIENT_CACHE.move_to_end(cache_key)
+            return client
+
+    if for_live:
+        client = genai.Client(api_key=api_key, http_options={'api_version': 'v1alpha'})
+    else:
+        client = genai.Client(api_key=api_key)
+
+    with _GEMINI_CLIENT_LOCK:
+        client = _GEMINI_CLIENT_CACHE.setdefault(cache_key, client)
+        if len(_GEMINI_CLIENT_CACHE) > _GEMINI_CLIENT_CACHE_SIZE:
+            _GEMINI_CLIENT_CACHE.popitem(last=False)
+    return client
+
 # ---------------------------------------------------------------------------
 # Runtime-configurable model selection
 # Priority order (highest first):
@@ -38,6 +85,10 @@ class GeminiProvider(LLMProvider):
     else:
         MODEL_NAME = "gemini-2.5-flash"  # Recommended default for 2025+
 
+    # Only the most recent messages are sent as context; callers can use this
+    # to avoid loading older history at all
+    CONTEXT_LIMIT = 20
+
     # ---------------------------------------------------------------------------
     # Emit a startup log so Docker users immediately see which model is active.
     # This runs once when the module is imported (i.e. when the Flask app starts
@@ -62,25 +113,14 @@ class GeminiProvider(LLMProvider):
     def _configure_client(self, api_key, for_live=False):
         # The google-genai package has changed, and genai.configure() is no longer available
         # Instead, we need to create a client instance with the API key
-        if not api_key and not os.getenv("REACT_APP_GEMINI_API_KEY"):
-            raise ValueError("REACT_APP_GEMINI_API_KEY not set and no API key provided to GeminiProvider.")
-        
         # Use the API key from the parameter or environment
-        client_api_key = api_key or os.getenv("REACT_APP_GEMINI_API_KEY")
+        client_api_key = api_key or _SERVER_API_KEY
+        if not client_api_key:
+            raise ValueError("REACT_APP_GEMINI_API_KEY not set and no API key provided to GeminiProvider.")
         
-        # For Live API, we need to specify the alpha API version
-        if for_live:
-            # Return a configured client for live API
-            return genai.Client(api_key=client_api_key, http_options={'api_version': 'v1alpha'})
-        else:
-            # Create a client for regular API
-            # The error indicates there's no genai.GenerativeModel attribute
-            # We need to use the client directly
-            client = genai.Client(api_key=client_api_key)
-            # The model should be accessed through the client
-            return client
+        return get_client(client_api_key, for_live=for_live)
 
-    def _prepare_gemini_messages(self, messages, context_limit=20):
+    def _prepare_gemini_messages(self, messages, context_limit=CONTEXT_LIMIT):
         """Convert our internal message dicts to Gemini's expected format.
 
         Changes vs. previous implementation:
@@ -112,9 +152,8 @@ class GeminiProvider(LLMProvider):
                 mime_type = msg["media_type"]
 
                 cache_key = (media_url, mime_type)
-                if cache_key in _GEMINI_FILE_CACHE:
-                    file_uri = _GEMINI_FILE_CACHE[cache_key]
-                else:
+                file_uri = _GEMINI_FILE_CACHE.get(cache_key)
+                if file_uri is None:
                     # Download the asset and push to Files API
                     try:
                         resp = requests.get(media_url, timeout=15)
@@ -129,7 +168,7 @@ class GeminiProvider(LLMProvider):
                         _GEMINI_FILE_CACHE[cache_key] = file_uri
                     except Exception as e:
                         current_app.logger.error(
-                            f"Failed to cache media for Gemini (url={media_url}): {e}"
+                            "Failed to cache media for Gemini (url=%s): %s", media_url, e
                         )
                         # Fall back: omit media to avoid breaking entire request
                         file_uri = None
@@ -156,7 +195,7 @@ class GeminiProvider(LLMProvider):
         # Get a configured client
         client = self._configure_client(api_key)
         try:
-            current_app.logger.debug(f"Sending to Gemini: {len(gemini_messages)} messages (context limited)")
+            current_app.logger.debug("Sending to Gemini: %d messages (context limited)", len(gemini_messages))
             # Enable Google Search grounding tool (v1beta)
             search_tool = types.Tool(google_search=types.GoogleSearch())
             gen_config = types.GenerateContentConfig(tools=[search_tool])
@@ -177,7 +216,7 @@ class GeminiProvider(LLMProvider):
                     return response.candidates[0].content.parts[0].text
             
             # If we got here, something unexpected happened
-            current_app.logger.error(f"Unexpected Gemini response structure: {response}")
+            current_app.logger.error("Unexpected Gemini response structure: %s", response)
             
             # Check for safety blocking
             if hasattr(response, 'prompt_feedback') and response.prompt_feedback:
@@ -187,7 +226,7 @@ class GeminiProvider(LLMProvider):
             return "Error: Received no valid response from Gemini."
             
         except Exception as e:
-            current_app.logger.error(f"Gemini API error: {str(e)}")
+            current_app.logger.error("Gemini API error: %s", e)
             return f"Error communicating with Gemini: {str(e)}"
 
     def stream_response(self, messages, api_key, **kwargs):
@@ -197,7 +236,7 @@ class GeminiProvider(LLMProvider):
         client = self._configure_client(api_key)
         
         try:
-            current_app.logger.debug(f"Sending to Gemini: {len(gemini_messages)} messages (context limited)")
+            current_app.logger.debug("Sending to Gemini: %d messages (context limited)", len(gemini_messages))
             # Re-use the same Google Search tool config for streaming
             search_tool = types.Tool(google_search=types.GoogleSearch())
             gen_config = types.GenerateContentConfig(tools=[search_tool])
@@ -208,21 +247,25 @@ class GeminiProvider(LLMProvider):
                 config=gen_config
             )
             
-            for chunk in stream:
-                # If the chunk has text, yield it
-                if hasattr(chunk, 'text'):
-                    yield chunk.text
-                # For older API versions or different response structures
-                elif hasattr(chunk, 'parts') and chunk.parts:
-                    yield chunk.parts[0].text
-                # Handle zero-length chunks by ignoring them
-                
-                # Handle safety blocks
-                elif hasattr(chunk, 'prompt_feedback') and chunk.prompt_feedback:
-                    if hasattr(chunk.prompt_feedback, 'block_reason') and chunk.prompt_feedback.block_reason:
-                        yield f"Content stream blocked by Gemini: {chunk.prompt_feedback.block_reason}"
-                        break  # Stop streaming if blocked
+            try:
+                for chunk in stream:
+                    text = getattr(chunk, 'text', None)
+                    # For older API versions or different response structures
+                    if text is None and getattr(chunk, 'parts', None):
+                        text = chunk.parts[0].text
+                    # Only non-empty text is yielded, so callers never see
+                    # zero-length chunks
+                    if text:
+                        yield text
+                    # Handle safety blocks
+                    elif hasattr(chunk, 'prompt_feedback') and chunk.prompt_feedback:
+                        if hasattr(chunk.prompt_feedback, 'block_reason') and chunk.prompt_feedback.block_reason:
+                            yield f"Content stream blocked by Gemini: {chunk.prompt_feedback.block_reason}"
+                            break  # Stop streaming if blocked
+            finally:
+                # Stop the upstream stream if the consumer stops early
+                stream.close()
 
         except Exception as e:
-            current_app.logger.error(f"Gemini API streaming error: {str(e)}")
+            current_app.logger.error("Gemini API streaming error: %s", e)
             yield f"Error streaming from Gemini: {str(e)}" 
\ No newline at end of file
@@ -1,10 +1,47 @@
+import logging
+import os
+import threading
+import httpx
 import openai
 from .base import LLMProvider
 
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# One pooled httpx.Client per worker process, shared by every openai.OpenAI
+# instance. The API key differs per request, but the connections to
+# api.openai.com don't, so keep-alive connections (and their TLS sessions)
+# are reused instead of being set up again for every reply.
+# ---------------------------------------------------------------------------
+_HTTP_CLIENT = None
+_HTTP_CLIENT_LOCK = threading.Lock()
+
+
+def _get_http_client():
+    """Return the process-wide httpx.Client, creating it on first use."""
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None:
+        with _HTTP_CLIENT_LOCK:
+            if _HTTP_CLIENT is None:
+                _HTTP_CLIENT = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", 100)),
+                        max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE", 50)),
+                        keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", 60)),
+                    ),
+                    timeout=httpx.Timeout(float(os.getenv("OPENAI_TIMEOUT", 60)), connect=10.0),
+                )
+    return _HTTP_CLIENT
+
+
+def get_client(api_key):
+    """Return an openai.OpenAI client for *api_key* on the shared connection pool."""
+    return openai.OpenAI(api_key=api_key, http_client=_get_http_client())
+
 class OpenAIProvider(LLMProvider):
     def get_response(self, messages, api_key, **kwargs):
-        # Create a client instance with the API key instead of setting it globally
-        client = openai.OpenAI(api_key=api_key)
+        # Per-key client on the shared connection pool, instead of setting the key globally
+        client = get_client(api_key)
         model = kwargs.get('model', 'gpt-4o')
         
         # Convert messages to handle multimodal content
@@ -46,8 +83,8 @@ class OpenAIProvider(LLMProvider):
         return response.choices[0].message.content.strip()
 
     def stream_response(self, messages, api_key, **kwargs):
-        print("[DEBUG] OpenAIProvider.stream_response called")
-        client = openai.OpenAI(api_key=api_key)
+        logger.debug("OpenAIProvider.stream_response called")
+        client = get_client(api_key)
         model = kwargs.get('model', 'gpt-4o')
         
         # Convert messages to handle multimodal content
@@ -61,24 +98,24 @@ class OpenAIProvider(LLMProvider):
                 if msg.get('media_url') and msg.get('media_type'):
                     # This is a multimodal message with both text and image
                     # For data URLs, we can pass them directly
-                    print(f"[DEBUG] Message has text and image: {msg.get('content')[:50]}... and {msg.get('media_url')[:50]}...")
+                    logger.debug("Message has text and image: %.50s... and %.50s...", msg.get('content'), msg.get('media_url'))
                     content_items = [
                         {"type": "text", "text": msg.get('content')},
                         {"type": "image_url", "image_url": {"url": msg.get('media_url')}}
                     ]
                 else:
                     # Text-only message
-                    print(f"[DEBUG] Text-only message: {msg.get('content')[:50]}...")
+                    logger.debug("Text-only message: %.50s...", msg.get('content'))
                     content_items = msg.get('content')
             elif msg.get('media_url') and msg.get('media_type'):
                 # Image-only message
                 # For data URLs, we can pass them directly
-                print(f"[DEBUG] Image-only message: {msg.get('media_url')[:50]}...")
+                logger.debug("Image-only message: %.50s...", msg.get('media_url'))
                 content_items = [
                     {"type": "image_url", "image_url": {"url": msg.get('media_url')}}
                 ]
             else:
-                print(f"[DEBUG] Message has no content or media: {msg}")
+                logger.debug("Message has no content or media: %s", msg)
                 continue  # Skip this message
             
             if isinstance(content_items, list):
@@ -86,9 +123,9 @@ class OpenAIProvider(LLMProvider):
             else:
                 api_messages.append({"role": role, "content": content_items})
         
-        print(f"[DEBUG] Final API message count: {len(api_messages)}")
+        logger.debug("Final API message count: %d", len(api_messages))
         try:
-            print(f"[DEBUG] Creating completion with model: {model}")
+            logger.debug("Creating completion with model: %s", model)
             stream = client.chat.completions.create(
                 model=model,
                 messages=api_messages,
@@ -97,11 +134,13 @@ class OpenAIProvider(LLMProvider):
                 stream=True,
             )
             
-            for chunk in stream:
-                if hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+            try:
+                for chunk in stream:
+                    if hasattr(chunk.choices[0].delta, 'content') and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                # Drop the HTTP response if the consumer stops early
+                stream.close()
         except Exception as e:
-            print(f"[DEBUG] OpenAI API error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("OpenAI API error: %s", e)
             raise 
\ No newline at end of file
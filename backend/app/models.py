@@ -100,9 +100,11 @@ class ChatSession(db.Model):
     # Link to user
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     
-    # Define relationship with cascade delete
+    # Define relationship with cascade delete. Reads come back in timestamp
+    # order, served by ix_chatmessage_session_ts rather than a sort.
     messages = db.relationship('ChatMessage', backref='chat_session', 
-                               lazy='dynamic', cascade='all, delete-orphan')
+                               lazy='dynamic', order_by='ChatMessage.timestamp',
+                               cascade='all, delete-orphan')
     
     # New relationship for interaction logs
     interaction_logs = db.relationship('InteractionLog', backref='chat_session',
@@ -113,12 +115,22 @@ class ChatSession(db.Model):
                                                    lazy='dynamic', cascade='all, delete-orphan')
 
     def to_dict(self):
+        return ChatSession.row_to_dict(self)
+
+    @classmethod
+    def dict_columns(cls):
+        """Columns to select for row_to_dict without loading ChatSession objects"""
+        return (cls.id, cls.name, cls.created_at, cls.provider, cls.user_id)
+
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize a ChatSession, or a row selected with dict_columns()"""
         return {
-            'id': self.id,
-            'name': self.name or f"Chat {self.id}", # Default name if not set
-            'created_at': self.created_at.isoformat(),
-            'provider': self.provider,
-            'user_id': self.user_id
+            'id': row.id,
+            'name': row.name or f"Chat {row.id}", # Default name if not set
+            'created_at': row.created_at.isoformat(),
+            'provider': row.provider,
+            'user_id': row.user_id
         }
 
 class Task(db.Model):
@@ -133,14 +145,25 @@ class Task(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     
     def to_dict(self):
+        return Task.row_to_dict(self)
+
+    @classmethod
+    def dict_columns(cls):
+        """Columns to select for row_to_dict without loading Task objects"""
+        return (cls.id, cls.title, cls.description, cls.completed,
+                cls.created_at, cls.updated_at, cls.user_id)
+
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize a Task, or a row selected with dict_columns()"""
         return {
-            'id': self.id,
-            'title': self.title,
-            'description': self.description,
-            'completed': self.completed,
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat(),
-            'user_id': self.user_id
+            'id': row.id,
+            'title': row.title,
+            'description': row.description,
+            'completed': row.completed,
+            'created_at': row.created_at.isoformat(),
+            'updated_at': row.updated_at.isoformat(),
+            'user_id': row.user_id
         }
 
 class ChatMessage(db.Model):
@@ -154,25 +177,41 @@ class ChatMessage(db.Model):
     media_type = db.Column(db.String(50), nullable=True)  # 'image', 'audio', etc.
     media_url = db.Column(db.String(2000), nullable=True)  # URL to the media file
 
+    # History is always read per session in timestamp order
+    __table_args__ = (
+        db.Index('ix_chatmessage_session_ts', 'chat_session_id', 'timestamp'),
+    )
+
     def to_dict(self):
+        return ChatMessage.row_to_dict(self)
+
+    @classmethod
+    def dict_columns(cls):
+        """Columns to select for row_to_dict without loading ChatMessage objects"""
+        return (cls.id, cls.text, cls.sender, cls.timestamp, cls.chat_session_id,
+                cls.media_type, cls.media_url)
+
+    @staticmethod
+    def row_to_dict(row):
+        """Serialize a ChatMessage, or a row selected with dict_columns()"""
         result = {
-            'id': self.id,
-            'text': self.text,
-            'sender': self.sender,
-            'timestamp': self.timestamp.isoformat(),
-            'chat_session_id': self.chat_session_id
+            'id': row.id,
+            'text': row.text,
+            'sender': row.sender,
+            'timestamp': row.timestamp.isoformat(),
+            'chat_session_id': row.chat_session_id
         }
         
         # Include media fields if they exist
-        if self.media_type:
-            result['media_type'] = self.media_type
-        if self.media_url:
+        if row.media_type:
+            result['media_type'] = row.media_type
+        if row.media_url:
             # Always return a fresh signed URL for cloud-storage assets to avoid expiry
             try:
                 from urllib.parse import urlparse
                 from app.services.storage import GCSStorageService
 
-                parsed = urlparse(self.media_url)
+                parsed = urlparse(row.media_url)
                 if parsed.netloc.endswith('googleapis.com'):
                     parts = parsed.path.lstrip('/').split('/', 1)
                     if len(parts) == 2:
@@ -180,19 +219,19 @@ class ChatMessage(db.Model):
                         new_url = GCSStorageService.regenerate_signed_url(blob_name, expiration_hours=168)
                         result['media_url'] = new_url
                     else:
-                        result['media_url'] = self.media_url
+                        result['media_url'] = row.media_url
                 else:
                     # Not a GCS URL – leave unchanged
-                    result['media_url'] = self.media_url
+                    result['media_url'] = row.media_url
             except Exception:
                 # In case of failure, fall back to stored value
-                result['media_url'] = self.media_url
+                result['media_url'] = row.media_url
             
         # Handle live session placeholder data stored in text field as JSON
-        if self.media_type == 'live_session_placeholder' and self.text:
+        if row.media_type == 'live_session_placeholder' and row.text:
             try:
                 import json
-                result['sessionData'] = json.loads(self.text)
+                result['sessionData'] = json.loads(row.text)
                 result['type'] = 'live_session_placeholder'
             except (json.JSONDecodeError, TypeError):
                 # Fallback if JSON parsing fails
@@ -1,17 +1,36 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
 from flask import current_app, session
 from urllib.parse import urlencode
+from sqlalchemy import select
 from ..models import User, OAuthAccount
 from .. import db
 import secrets
 import hashlib
 import base64
+import time
+
+# Shared HTTP session so discovery/token/userinfo calls to the OAuth provider
+# reuse pooled keep-alive connections instead of a new TCP (+TLS) handshake
+# per request. Retry only applies to idempotent methods (GET), not the
+# token-exchange POST.
+OAUTH_HTTP_TIMEOUT = 5
+_http = requests.Session()
+_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=50,
+                       max_retries=Retry(total=2, backoff_factor=0.2))
+_http.mount('http://', _adapter)
+_http.mount('https://', _adapter)
 
 class AuthService:
     """Service for handling OAuth authentication with Dex"""
     
+    # The discovery document is static for a given issuer, so fetch it at most
+    # once per TTL instead of on every login/callback/userinfo request.
+    DISCOVERY_CACHE_TTL = int(os.getenv('OAUTH_DISCOVERY_CACHE_TTL', 3600))
+    
     def __init__(self):
         self.oauth_issuer = os.getenv('OAUTH_ISSUER', 'http://oauth-server:5556/dex')
         self.client_id = os.getenv('OAUTH_CLIENT_ID', 'chat-app-dev')
@@ -21,11 +40,25 @@ class AuthService:
         # Public issuer visible to the browser (may differ from in-cluster issuer)
         # Defaults to internal issuer unless explicitly overridden.
         self.public_oauth_issuer = os.getenv('PUBLIC_OAUTH_ISSUER', self.oauth_issuer)
+        self._discovery_cache = None
+        self._discovery_fetched_at = 0.0
+        
+        # Parts of the authorization request that don't change per login
+        self._authorization_endpoint = f"{self.public_oauth_issuer.rstrip('/')}/auth"
+        self._static_auth_params = {
+            'client_id': self.client_id,
+            'response_type': 'code',
+            'scope': 'openid profile email',
+            'redirect_uri': self.redirect_uri,
+        }
         
     def get_discovery_document(self):
-        """Get OAuth discovery document from Dex"""
+        """Get OAuth discovery document from Dex (cached for DISCOVERY_CACHE_TTL seconds)"""
+        if self._discovery_cache and time.monotonic() - self._discovery_fetched_at < self.DISCOVERY_CACHE_TTL:
+            return self._discovery_cache
+        
         try:
-            response = requests.get(f"{self.oauth_issuer}/.well-known/openid-configuration")
+            response = _http.get(f"{self.oauth_issuer}/.well-known/openid-configuration", timeout=OAUTH_HTTP_TIMEOUT)
             response.raise_for_status()
             discovery = response.json()
             
@@ -33,6 +66,9 @@ class AuthService:
             # but create a browser-friendly issuer for the frontend
             discovery['browser_issuer'] = discovery.get('issuer', '').replace('http://oauth-server:5556/dex', 'http://auth.localhost/dex')
             
+            # Only cache real documents so a transient failure is retried next time
+            self._discovery_cache = discovery
+            self._discovery_fetched_at = time.monotonic()
             return discovery
         except requests.RequestException as e:
             current_app.logger.error(f"Failed to get discovery document: {e}")
@@ -67,7 +103,7 @@ class AuthService:
         # Build a browser-reachable authorization endpoint.  In most cases this
         # is just the public issuer + "/auth".  We fall back to the discovery
         # document's endpoint if no PUBLIC_OAUTH_ISSUER override is present.
-        authorization_endpoint = f"{self.public_oauth_issuer.rstrip('/')}/auth"
+        authorization_endpoint = self._authorization_endpoint
         
         # Generate PKCE parameters
         code_verifier, code_challenge = self.generate_pkce_challenge()
@@ -81,10 +117,7 @@ class AuthService:
         
         # Build authorization URL
         params = {
-            'client_id': self.client_id,
-            'response_type': 'code',
-            'scope': 'openid profile email',
-            'redirect_uri': self.redirect_uri,
+            **self._static_auth_params,
             'state': state,
             'code_challenge': code_challenge,
             'code_challenge_method': 'S256'
@@ -125,7 +158,7 @@ class AuthService:
         }
         
         try:
-            response = requests.post(token_endpoint, data=token_data)
+            response = _http.post(token_endpoint, data=token_data, timeout=OAUTH_HTTP_TIMEOUT)
             response.raise_for_status()
             tokens = response.json()
             
@@ -151,7 +184,7 @@ class AuthService:
         headers = {'Authorization': f'Bearer {access_token}'}
         
         try:
-            response = requests.get(userinfo_endpoint, headers=headers)
+            response = _http.get(userinfo_endpoint, headers=headers, timeout=OAUTH_HTTP_TIMEOUT)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
@@ -171,10 +204,12 @@ class AuthService:
                 return None
             
             # Check if OAuth account exists
-            oauth_account = OAuthAccount.query.filter_by(
-                provider=provider,
-                provider_id=provider_id
-            ).first()
+            oauth_account = db.session.execute(
+                select(OAuthAccount).where(
+                    OAuthAccount.provider == provider,
+                    OAuthAccount.provider_id == provider_id
+                )
+            ).scalar_one_or_none()
             
             if oauth_account:
                 # Update existing user
@@ -194,24 +229,25 @@ class AuthService:
                 
             else:
                 # Check if user exists by email
-                user = User.query.filter_by(email=email).first()
+                user = db.session.execute(
+                    select(User).where(User.email == email)
+                ).scalar_one_or_none()
                 
                 if not user:
                     # Create new user
                     user = User(
                         email=email,
-                        username=username,
+                        username=self._unique_username(username),
                         display_name=user_info.get('name', username),
                         is_active=True,
                         is_verified=True,  # OAuth users are considered verified
                         last_login_at=datetime.utcnow()
                     )
                     db.session.add(user)
-                    db.session.flush()  # Get user ID
                 
-                # Create OAuth account
+                # Create OAuth account; linked through the relationship so the
+                # commit inserts user and account in one flush
                 oauth_account = OAuthAccount(
-                    user_id=user.id,
                     provider=provider,
                     provider_id=provider_id,
                     provider_email=email,
@@ -227,7 +263,7 @@ class AuthService:
                         seconds=tokens['expires_in']
                     )
                 
-                db.session.add(oauth_account)
+                user.oauth_accounts.append(oauth_account)
             
             db.session.commit()
             return user
@@ -237,6 +273,26 @@ class AuthService:
             current_app.logger.error(f"Failed to create/update user: {e}")
             return None
     
+    def _unique_username(self, base_username):
+        """Return base_username, or the first free base_username_N if it is taken.
+
+        Fetches every existing ``base_username%`` in one query and picks the
+        suffix in memory instead of probing one candidate per round-trip.
+        """
+        if not base_username:
+            return base_username
+        
+        taken = set(db.session.execute(
+            select(User.username).where(User.username.like(f"{base_username}%"))
+        ).scalars())
+        if base_username not in taken:
+            return base_username
+        
+        counter = 1
+        while f"{base_username}_{counter}" in taken:
+            counter += 1
+        return f"{base_username}_{counter}"
+    
     def login_user(self, user):
         """Log in user by setting session"""
         session['user_id'] = user.id
@@ -253,7 +309,7 @@ class AuthService:
         if not session.get('logged_in') or not session.get('user_id'):
             return None
         
-        return User.query.get(session['user_id'])
+        return db.session.get(User, session['user_id'])
     
     def is_authenticated(self):
         """Check if user is authenticated"""
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import orjson
+
+
+class ResponseCache:
+    """In-process LRU cache of LLM replies, keyed on the exact request.
+
+    A key covers the provider, model, API key, the user who owns the chat
+    and the full message history sent to the provider, so a hit only
+    happens when the same user sends the same conversation again (new chats
+    opened with the same prompt, demo scripts). Replies are never shared
+    between users, even when they call the provider on the server's key.
+    Entries expire after ``ttl`` seconds; a ``ttl`` or ``max_entries`` of 0
+    disables the cache.
+    """
+
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    @staticmethod
+    def make_key(provider_name, model, api_key, user_id, provider_messages):
+        """Return a digest identifying one provider request by one user."""
+        digest = hashlib.sha256()
+        digest.update(orjson.dumps([provider_name, model, api_key, user_id]))
+        digest.update(orjson.dumps(provider_messages, option=orjson.OPT_SORT_KEYS))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached reply for *key*, or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, text = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return text
+
+    def put(self, key, text):
+        """Store *text* as the reply for *key*."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Global reply cache, shared by the chat routes in this worker process
+llm_response_cache = ResponseCache(
+    max_entries=int(os.getenv('LLM_RESPONSE_CACHE_SIZE', 256)),
+    ttl=int(os.getenv('LLM_RESPONSE_CACHE_TTL', 300)),
+)
@@ -1,10 +1,42 @@
 import os
 import uuid
+import threading
 from werkzeug.utils import secure_filename
 from flask import current_app
 from google.cloud import storage
 import datetime
 
+# One storage.Client per worker process. Building a client loads credentials
+# and sets up a new HTTP session, so it isn't redone for every upload.
+_storage_client = None
+_storage_client_lock = threading.Lock()
+
+# Resumable uploads are sent in chunks of this size, which bounds how much of
+# a large file the client buffers at once (the library default is 100 MiB).
+# Must be a multiple of 256 KiB.
+UPLOAD_CHUNK_SIZE = int(os.environ.get('GCS_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+
+
+def _get_bucket():
+    """Return the upload bucket on the shared storage client."""
+    global _storage_client
+    if _storage_client is None:
+        with _storage_client_lock:
+            if _storage_client is None:
+                _storage_client = storage.Client()
+    return _storage_client.bucket(GCSStorageService.BUCKET_NAME)
+
+
+def _stream_size(file):
+    """Return the number of bytes left in *file*, or None if it can't seek."""
+    try:
+        start = file.tell()
+        end = file.seek(0, os.SEEK_END)
+        file.seek(start)
+        return end - start
+    except (AttributeError, OSError, ValueError):
+        return None
+
 class GCSStorageService:
     """Google Cloud Storage service for file uploads"""
     
@@ -30,11 +62,7 @@ class GCSStorageService:
             raise ValueError("No file provided")
             
         try:
-            # Create a client
-            storage_client = storage.Client()
-            
-            # Get bucket
-            bucket = storage_client.bucket(GCSStorageService.BUCKET_NAME)
+            bucket = _get_bucket()
             
             # Generate a secure unique filename if not provided
             if custom_filename:
@@ -43,15 +71,17 @@ class GCSStorageService:
                 original_filename = secure_filename(file.filename)
                 blob_name = f"{uuid.uuid4()}_{original_filename}"
             
-            # Create blob
-            blob = bucket.blob(blob_name)
+            # Create blob; uploads over 8 MiB go up in UPLOAD_CHUNK_SIZE pieces
+            blob = bucket.blob(blob_name, chunk_size=UPLOAD_CHUNK_SIZE)
             
             # Set content type
             content_type = file.content_type
             
-            # Upload file
+            # Upload file straight from its stream. With the size known,
+            # small files go up in a single multipart request instead of
+            # starting a resumable session.
             file.seek(0)  # Ensure we're at the start of the file
-            blob.upload_from_file(file, content_type=content_type)
+            blob.upload_from_file(file, content_type=content_type, size=_stream_size(file))
             
             # Determine expiration based on use case
             if expiration_hours is None:
@@ -98,12 +128,8 @@ class GCSStorageService:
             New signed URL string
         """
         try:
-            # Create a client
-            storage_client = storage.Client()
-            
             # Get bucket and blob
-            bucket = storage_client.bucket(GCSStorageService.BUCKET_NAME)
-            blob = bucket.blob(blob_name)
+            blob = _get_bucket().blob(blob_name)
             
             # Check if blob exists
             if not blob.exists():
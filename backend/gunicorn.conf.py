@@ -1,8 +1,14 @@
+import os
+
 bind = "0.0.0.0:8080"
-workers = 1
-worker_class = "sync"
+# Threaded workers, so a request waiting on an LLM reply or holding an SSE
+# stream open only ties up one thread instead of a whole worker process.
+# The app already hands provider streams and uploads to threads of its own.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("GUNICORN_WORKERS", 2))
+threads = int(os.getenv("GUNICORN_THREADS", 16))
 timeout = 300  # Increased from 30 to 300 seconds for video processing
-keepalive = 2
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
 max_requests = 1000
 max_requests_jitter = 100
-preload_app = True 
\ No newline at end of file
+preload_app = True
@@ -0,0 +1,35 @@
+"""Add composite (chat_session_id, timestamp) index to chat_message
+
+Revision ID: b27856c7bc8f
+Revises: 383c0a37c5aa
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b27856c7bc8f'
+down_revision = '383c0a37c5aa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Index a session's messages in timestamp order"""
+    # CONCURRENTLY can't run inside a transaction; build the index without
+    # locking chat_message against writes on a live database
+    with op.get_context().autocommit_block():
+        op.create_index('ix_chatmessage_session_ts',
+                        'chat_message',
+                        ['chat_session_id', 'timestamp'],
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    """Drop the composite index"""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_chatmessage_session_ts',
+                      table_name='chat_message',
+                      postgresql_concurrently=True)
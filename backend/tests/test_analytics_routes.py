@@ -0,0 +1,72 @@
+import unittest
+import json
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.api import analytics_routes
+
+
+class TestAnalyticsRoutes(unittest.TestCase):
+    """Test suite for the Live API analytics endpoints"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+
+    def test_health_check(self):
+        """Test the precomputed health response"""
+        response = self.client.get('/api/analytics/health')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(json.loads(response.data)['status'], 'healthy')
+
+    def test_log_session_start_is_queued(self):
+        """Test session start records are drained by the background thread"""
+        with patch.object(analytics_routes.logger, 'isEnabledFor', return_value=True), \
+             patch.object(analytics_routes.logger, 'info') as mock_info:
+            response = self.client.post('/api/analytics/log-session-start',
+                                        json={'voice': 'Puck', 'model': 'gemini'})
+            analytics_routes._analytics_q.join()
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertTrue(data['success'])
+
+        message, record = mock_info.call_args[0]
+        self.assertEqual(message, 'Live API session started: %s')
+        self.assertEqual(record['voice'], 'Puck')
+        self.assertEqual(record['timestamp'], data['timestamp'])
+
+    def test_log_session_end_iso_timestamp(self):
+        """Test timestamps are epoch ms unless ?format=iso is requested"""
+        response = self.client.post('/api/analytics/log-session-end', json={})
+        self.assertIsInstance(json.loads(response.data)['timestamp'], int)
+
+        response = self.client.post('/api/analytics/log-session-end?format=iso', json={})
+        timestamp = json.loads(response.data)['timestamp']
+        self.assertIsInstance(timestamp, str)
+        self.assertIn('T', timestamp)
+        self.assertTrue(timestamp.endswith('+00:00'))
+
+    def test_log_interaction_drops_when_queue_full(self):
+        """Test a full queue drops the record instead of blocking the request"""
+        dropped = analytics_routes._analytics_dropped
+
+        with patch.object(analytics_routes.logger, 'isEnabledFor', return_value=True), \
+             patch.object(analytics_routes, '_ensure_drain_thread'), \
+             patch.object(analytics_routes._analytics_q, 'put_nowait',
+                          side_effect=analytics_routes.queue.Full):
+            response = self.client.post('/api/analytics/log-interaction',
+                                        json={'type': 'text'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(analytics_routes._analytics_dropped, dropped + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
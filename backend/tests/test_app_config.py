@@ -0,0 +1,61 @@
+import unittest
+import logging
+from unittest.mock import patch
+
+import click
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app, db
+from app.config import TestingConfig
+
+
+class TestEngineOptions(unittest.TestCase):
+    """Test suite for the database pool configuration"""
+
+    @patch.dict(os.environ, {'DATABASE_URL': 'sqlite://'})
+    def test_sqlite_url_boots_without_pool_options(self):
+        """Test a sqlite DATABASE_URL doesn't get the Postgres pool options"""
+        logger = logging.getLogger('app')
+        self.addCleanup(setattr, logger, 'handlers', list(logger.handlers))
+        app = create_app()
+        self.addCleanup(app.logger.handlers[0].stop)
+        self.assertNotIn('pool_size', app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        with app.app_context():
+            self.assertEqual(db.engine.dialect.name, 'sqlite')
+
+
+
+class TestMigrateRegistration(unittest.TestCase):
+    """Test suite for when Flask-Migrate is wired up"""
+
+    def test_registered_only_under_flask_cli(self):
+        """Test `flask db` works from the CLI while plain app creation skips Migrate"""
+        self.assertNotIn('migrate', create_app('testing').extensions)
+
+        with click.Context(click.Command('db')):
+            self.assertIn('migrate', create_app('testing').extensions)
+
+
+
+class TestVideoRoutes(unittest.TestCase):
+    """Test suite for the ENABLE_VIDEO_CREATION flag"""
+
+    def _video_rules(self, app):
+        return [rule.rule for rule in app.url_map.iter_rules() if 'session-video' in rule.rule]
+
+    def test_flag_is_read_per_app(self):
+        """Test apps in one process can differ in whether video routes are on"""
+        self.assertEqual(self._video_rules(create_app('testing')), [])
+
+        with patch.object(TestingConfig, 'ENABLE_VIDEO_CREATION', True, create=True):
+            app = create_app('testing')
+        self.assertIn('/api/create-session-video', self._video_rules(app))
+
+        self.assertEqual(self._video_rules(create_app('testing')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -104,8 +104,8 @@ class TestAuthRoutes(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('error', data)
     
-    @patch('app.services.auth_service.requests.get')
-    @patch('app.services.auth_service.requests.post')
+    @patch('app.services.auth_service._http.get')
+    @patch('app.services.auth_service._http.post')
     @patch('app.services.auth_service.AuthService.get_discovery_document')
     def test_callback_success(self, mock_discovery, mock_post, mock_get):
         """Test successful /api/auth/callback"""
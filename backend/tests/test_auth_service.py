@@ -63,7 +63,7 @@ class TestAuthService(unittest.TestCase):
         self.assertEqual(self.auth_service.client_secret, 'chat-app-dev-secret-12345')
         self.assertEqual(self.auth_service.redirect_uri, 'http://auth.localhost/auth/callback')
     
-    @patch('app.services.auth_service.requests.get')
+    @patch('app.services.auth_service._http.get')
     def test_get_discovery_document_success(self, mock_get):
         """Test successful discovery document retrieval"""
         mock_response = Mock()
@@ -74,9 +74,9 @@ class TestAuthService(unittest.TestCase):
         result = self.auth_service.get_discovery_document()
         
         self.assertEqual(result, self.mock_discovery)
-        mock_get.assert_called_once_with('http://localhost:5556/.well-known/openid_configuration')
+        mock_get.assert_called_once_with('http://localhost:5556/.well-known/openid_configuration', timeout=5)
     
-    @patch('app.services.auth_service.requests.get')
+    @patch('app.services.auth_service._http.get')
     def test_get_discovery_document_fallback(self, mock_get):
         """Test discovery document fallback when request fails"""
         import requests
@@ -93,6 +93,25 @@ class TestAuthService(unittest.TestCase):
         self.assertIn('userinfo_endpoint', result)
         self.assertEqual(result['authorization_endpoint'], 'http://auth.localhost/dex/auth')
     
+    @patch('app.services.auth_service._http.get')
+    def test_get_discovery_document_cached(self, mock_get):
+        """Test discovery document is fetched once and reused until the TTL expires"""
+        mock_response = Mock()
+        mock_response.json.return_value = self.mock_discovery
+        mock_response.raise_for_status.return_value = None
+        mock_get.return_value = mock_response
+        
+        first = self.auth_service.get_discovery_document()
+        second = self.auth_service.get_discovery_document()
+        
+        self.assertIs(first, second)
+        self.assertEqual(mock_get.call_count, 1)
+        
+        # Expire the cache and make sure it is refreshed
+        self.auth_service._discovery_fetched_at -= AuthService.DISCOVERY_CACHE_TTL
+        self.auth_service.get_discovery_document()
+        self.assertEqual(mock_get.call_count, 2)
+    
     def test_generate_pkce_challenge(self):
         """Test PKCE challenge generation"""
         code_verifier, code_challenge = self.auth_service.generate_pkce_challenge()
@@ -132,7 +151,7 @@ class TestAuthService(unittest.TestCase):
         
         self.assertEqual(result, (None, None, None))
     
-    @patch('app.services.auth_service.requests.post')
+    @patch('app.services.auth_service._http.post')
     @patch('app.services.auth_service.AuthService.get_discovery_document')
     def test_exchange_code_for_tokens_success(self, mock_discovery, mock_post):
         """Test successful token exchange"""
@@ -164,7 +183,7 @@ class TestAuthService(unittest.TestCase):
         
         self.assertIsNone(result)
     
-    @patch('app.services.auth_service.requests.get')
+    @patch('app.services.auth_service._http.get')
     @patch('app.services.auth_service.AuthService.get_discovery_document')
     def test_get_user_info_success(self, mock_discovery, mock_get):
         """Test successful user info retrieval"""
@@ -237,6 +256,21 @@ class TestAuthService(unittest.TestCase):
         oauth_account = OAuthAccount.query.filter_by(user_id=updated_user.id).first()
         self.assertEqual(oauth_account.access_token, 'mock_access_token_123')
     
+    def test_create_or_update_user_username_taken(self):
+        """Test a new user gets a suffixed username when the preferred one is taken"""
+        with self.app.test_request_context():
+            db.session.add_all([
+                User(email='other@example.com', username='testuser'),
+                User(email='third@example.com', username='testuser_1'),
+            ])
+            db.session.commit()
+            
+            user = self.auth_service.create_or_update_user(self.mock_user_info, self.mock_tokens)
+        
+        self.assertIsNotNone(user)
+        self.assertEqual(user.email, 'test@example.com')
+        self.assertEqual(user.username, 'testuser_2')
+    
     def test_create_or_update_user_missing_required_info(self):
         """Test handling missing required user info"""
         incomplete_user_info = {'email': 'test@example.com'}  # Missing 'sub'
@@ -0,0 +1,548 @@
+import unittest
+import json
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import event
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app, db
+from app.models import User, ChatSession, ChatMessage
+from app.llm_providers import GeminiProvider
+from app.api import routes
+from app.services.response_cache import llm_response_cache
+
+
+class TestHealthCheck(unittest.TestCase):
+    """Test suite for the API health endpoint"""
+
+    def test_health_check(self):
+        """Test the health body is valid JSON with a fresh timestamp"""
+        client = create_app('testing').test_client()
+        response = client.get('/api/health')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/json')
+        data = json.loads(response.data)
+        self.assertEqual(data['status'], 'healthy')
+        self.assertIn('T', data['timestamp'])
+
+
+class TestChatSessionRoutes(unittest.TestCase):
+    """Test suite for chat session management"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client = self.app.test_client()
+
+        # Create all tables
+        db.create_all()
+
+        user = User(email='test@example.com', username='testuser')
+        db.session.add(user)
+        db.session.commit()
+        self.user_id = user.id
+
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = user.id
+            sess['logged_in'] = True
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_create_chat_session(self):
+        """Test a new session is returned with its generated id and defaults"""
+        response = self.client.post('/api/chat_sessions', json={'provider': 'gemini'})
+
+        self.assertEqual(response.status_code, 201)
+        data = json.loads(response.data)
+        session = db.session.get(ChatSession, data['id'])
+        self.assertEqual(data, session.to_dict())
+        self.assertEqual(data['name'], f"Chat {data['id']}")
+        self.assertEqual(data['provider'], 'gemini')
+        self.assertEqual(data['user_id'], self.user_id)
+
+    def test_list_chat_sessions(self):
+        """Test the projected session list matches to_dict, newest first, for this user only"""
+        other = User(email='other@example.com', username='other')
+        db.session.add(other)
+        db.session.flush()
+        older = ChatSession(name='Older', user_id=self.user_id, created_at=datetime.utcnow() - timedelta(days=1))
+        newer = ChatSession(user_id=self.user_id)
+        db.session.add_all([older, newer, ChatSession(name='Not mine', user_id=other.id)])
+        db.session.commit()
+
+        response = self.client.get('/api/chat_sessions')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), [newer.to_dict(), older.to_dict()])
+        self.assertEqual(json.loads(response.data)[0]['name'], f'Chat {newer.id}')
+
+
+class TestChatStreaming(unittest.TestCase):
+    """Test suite for the chat LLM streaming endpoint"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client = self.app.test_client()
+        llm_response_cache.clear()
+
+        # Create all tables
+        db.create_all()
+
+        user = User(email='test@example.com', username='testuser')
+        db.session.add(user)
+        db.session.flush()
+        chat_session = ChatSession(name='Test chat', provider='openai', user_id=user.id)
+        db.session.add(chat_session)
+        db.session.commit()
+        self.session_id = chat_session.id
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _events(self, response):
+        """Parse the SSE body into a list of JSON payloads"""
+        body = response.get_data(as_text=True)
+        return [json.loads(frame[len('data: '):]) for frame in body.split('\n\n') if frame]
+
+    @patch('app.llm_providers.openai_provider.OpenAIProvider.stream_response')
+    def test_stream_emits_deltas_and_saves_reply(self, mock_stream):
+        """Test deltas are streamed as SSE frames and the reply is stored"""
+        mock_stream.return_value = (chunk for chunk in ['Hello', ', ', 'wörld "quoted"\n'])
+
+        response = self.client.get(
+            f'/api/chat_sessions/{self.session_id}/respond_llm_stream',
+            query_string={'text': 'Hi', 'api_key': 'sk-test', 'provider': 'openai'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(response.headers['X-Accel-Buffering'], 'no')
+
+        events = self._events(response)
+        self.assertEqual(''.join(e['delta'] for e in events if 'delta' in e), 'Hello, wörld "quoted"\n')
+        self.assertEqual(events[-1], {'done': True})
+
+        messages = ChatMessage.query.filter_by(chat_session_id=self.session_id) \
+            .order_by(ChatMessage.id).all()
+        self.assertEqual([(m.sender, m.text) for m in messages],
+                         [('user', 'Hi'), ('bot', 'Hello, wörld "quoted"\n')])
+
+    @patch('app.llm_providers.openai_provider.OpenAIProvider.stream_response')
+    def test_provider_exception_sent_as_error_frame(self, mock_stream):
+        """Test an exception raised on the producer thread reaches the client"""
+        def provider_stream():
+            yield 'partial'
+            raise RuntimeError('upstream reset')
+
+        mock_stream.return_value = provider_stream()
+
+        response = self.client.get(
+            f'/api/chat_sessions/{self.session_id}/respond_llm_stream',
+            query_string={'text': 'Hi', 'api_key': 'sk-test', 'provider': 'openai'}
+        )
+
+        events = self._events(response)
+        self.assertEqual(events[0], {'delta': 'partial'})
+        self.assertIn('upstream reset', events[1]['error'])
+        self.assertEqual(events[-1], {'done': True})
+        # The user's message is kept; only the failed reply is missing
+        messages = ChatMessage.query.filter_by(chat_session_id=self.session_id).all()
+        self.assertEqual([(m.sender, m.text) for m in messages], [('user', 'Hi')])
+
+    @patch('app.llm_providers.gemini_provider.GeminiProvider.stream_response')
+    def test_error_reply_not_saved(self, mock_stream):
+        """Test a reply carrying a provider error marker isn't stored"""
+        mock_stream.return_value = (chunk for chunk in ['Error streaming from Gemini: quota'])
+
+        response = self.client.get(
+            f'/api/chat_sessions/{self.session_id}/respond_llm_stream',
+            query_string={'text': 'Hi', 'provider': 'gemini'}
+        )
+
+        self.assertEqual(self._events(response)[-1], {'done': True})
+        messages = ChatMessage.query.filter_by(chat_session_id=self.session_id).all()
+        self.assertEqual([(m.sender, m.text) for m in messages], [('user', 'Hi')])
+
+    @patch('app.llm_providers.openai_provider.OpenAIProvider.stream_response')
+    def test_client_disconnect_closes_provider_stream(self, mock_stream):
+        """Test closing the response mid-stream closes the provider generator"""
+        closed = []
+
+        def provider_stream():
+            try:
+                while True:
+                    yield 'token'
+            finally:
+                closed.append(True)
+
+        mock_stream.return_value = provider_stream()
+
+        response = self.client.get(
+            f'/api/chat_sessions/{self.session_id}/respond_llm_stream',
+            query_string={'text': 'Hi', 'api_key': 'sk-test', 'provider': 'openai'},
+            buffered=False
+        )
+        first = next(iter(response.response))
+        self.assertTrue(first.startswith(b'data: {"delta"'))
+
+        response.close()
+        # The provider is closed by its producer thread after the next chunk
+        for _ in range(100):
+            if closed:
+                break
+            time.sleep(0.01)
+        self.assertEqual(closed, [True])
+        # Closing the stream still saves the user's message
+        self.assertEqual(ChatMessage.query.filter_by(chat_session_id=self.session_id, sender='user').count(), 1)
+
+    @patch('app.llm_providers.gemini_provider.GeminiProvider.stream_response')
+    def test_stream_history_and_provider_switch(self, mock_stream):
+        """Test the provider sees prior history plus the new message and the switch is saved"""
+        db.session.add(ChatMessage(text='Earlier', sender='bot', chat_session_id=self.session_id,
+                                   timestamp=datetime.utcnow() - timedelta(minutes=1)))
+        db.session.commit()
+        mock_stream.return_value = (chunk for chunk in ['Ok'])
+
+        response = self.client.get(
+            f'/api/chat_sessions/{self.session_id}/respond_llm_stream',
+            query_string={'text': 'Hi', 'provider': 'gemini'}
+        )
+        self.assertEqual(self._events(response)[-1], {'done': True})
+
+        history = mock_stream.call_args[0][0]
+        self.assertEqual([(m['sender'], m['text']) for m in history], [('bot', 'Earlier'), ('user', 'Hi')])
+        self.assertEqual(db.session.get(ChatSession, self.session_id).provider, 'gemini')
+
+    @patch('app.llm_providers.openai_provider.OpenAIProvider.stream_response')
+    def test_cached_reply_is_replayed(self, mock_stream):
+        """Test a cached reply is streamed and saved without calling the provider"""
+        mock_stream.return_value = (chunk for chunk in ['Fresh ', 'reply'])
+        query = {'text': 'Hi', 'api_key': 'sk-test', 'provider': 'openai'}
+        first = self.client.get(f'/api/chat_sessions/{self.session_id}/respond_llm_stream', query_string=query)
+        self.assertEqual(self._events(first)[-1], {'done': True})
+
+        other = ChatSession(name='Other chat', provider='openai', user_id=ChatSession.query.first().user_id)
+        db.session.add(other)
+        db.session.commit()
+        response = self.client.get(f'/api/chat_sessions/{other.id}/respond_llm_stream', query_string=query)
+
+        events = self._events(response)
+        self.assertEqual(events, [{'delta': 'Fresh reply'}, {'done': True}])
+        self.assertEqual(mock_stream.call_count, 1)
+        self.assertEqual(ChatMessage.query.filter_by(chat_session_id=other.id, sender='bot').one().text,
+                         'Fresh reply')
+
+    def test_stream_requires_text_or_media(self):
+        """Test the stream rejects requests with no content"""
+        response = self.client.get(
+            f'/api/chat_sessions/{self.session_id}/respond_llm_stream',
+            query_string={'api_key': 'sk-test'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class TestStreamCoalescing(unittest.TestCase):
+    """Test suite for the threaded, coalescing provider stream reader"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+
+    def test_tokens_within_window_are_joined(self):
+        """Test queued tokens are merged into one chunk"""
+        with patch.object(routes, '_STREAM_COALESCE_WINDOW', 0.5):
+            chunks = list(routes._iter_in_thread(self.app, (t for t in ['a', 'b', 'c'])))
+        self.assertEqual(chunks, ['abc'])
+
+    def test_batches_are_capped(self):
+        """Test a long backlog is split into frames of at most eight tokens"""
+        with patch.object(routes, '_STREAM_COALESCE_WINDOW', 0.5):
+            chunks = list(routes._iter_in_thread(self.app, (t for t in ['x'] * 10)))
+        self.assertEqual(chunks, ['x' * 8, 'xx'])
+
+    def test_exception_after_tokens_is_raised(self):
+        """Test tokens before a provider error are still delivered"""
+        def provider_stream():
+            yield 'a'
+            raise RuntimeError('upstream reset')
+
+        with patch.object(routes, '_STREAM_COALESCE_WINDOW', 0.5):
+            reader = routes._iter_in_thread(self.app, provider_stream())
+            self.assertEqual(next(reader), 'a')
+            with self.assertRaises(RuntimeError):
+                next(reader)
+
+
+class TestChatRespond(unittest.TestCase):
+    """Test suite for the non-streaming chat LLM endpoint"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client = self.app.test_client()
+        llm_response_cache.clear()
+
+        # Create all tables
+        db.create_all()
+
+        user = User(email='test@example.com', username='testuser')
+        db.session.add(user)
+        db.session.flush()
+        chat_session = ChatSession(name='Test chat', provider='openai', user_id=user.id)
+        db.session.add(chat_session)
+        db.session.add(ChatMessage(text='Earlier question', sender='user', chat_session=chat_session))
+        db.session.commit()
+        self.session_id = chat_session.id
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _stored(self):
+        return [(m.sender, m.text) for m in ChatMessage.query.filter_by(chat_session_id=self.session_id)
+                .order_by(ChatMessage.timestamp, ChatMessage.id)]
+
+    @patch('app.llm_providers.openai_provider.OpenAIProvider.get_response')
+    def test_reply_saved_with_user_message(self, mock_response):
+        """Test the user message and reply are stored together, in order"""
+        mock_response.return_value = 'Sure thing'
+
+        response = self.client.post(f'/api/chat_sessions/{self.session_id}/respond_llm',
+                                    json={'text': 'Hi', 'api_key': 'sk-test', 'provider': 'openai'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['text'], 'Sure thing')
+
+        history = mock_response.call_args[0][0]
+        self.assertEqual(history, [{'role': 'user', 'content': 'Earlier question'},
+                                   {'role': 'user', 'content': 'Hi'}])
+        self.assertEqual(self._stored(), [('user', 'Earlier question'), ('user', 'Hi'), ('bot', 'Sure thing')])
+
+    def test_get_session_messages(self):
+        """Test messages are listed oldest first and unknown sessions 404"""
+        response = self.client.get(f'/api/chat_sessions/{self.session_id}/messages')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['text'] for m in json.loads(response.data)], ['Earlier question'])
+
+        self.assertEqual(self.client.get('/api/chat_sessions/9999/messages').status_code, 404)
+
+    def test_empty_session_messages_query_count(self):
+        """Test an empty session costs the same two queries as before ETags"""
+        empty = ChatSession(name='Empty chat', provider='openai', user_id=ChatSession.query.one().user_id)
+        db.session.add(empty)
+        db.session.commit()
+        empty_id = empty.id
+        db.session.expunge_all()
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = self.client.get(f'/api/chat_sessions/{empty_id}/messages')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        self.assertEqual(json.loads(response.data), [])
+        # Message version and session existence; there is no list to load
+        self.assertEqual(len(statements), 2)
+
+    def test_session_messages_revalidate_with_etag(self):
+        """Test polling an unchanged session returns 304 until a message is added"""
+        url = f'/api/chat_sessions/{self.session_id}/messages'
+        first = self.client.get(url)
+        self.assertEqual(first.headers['Cache-Control'], 'private, no-cache')
+
+        response = self.client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        # Signed media URLs in the body are renewed once the epoch rolls over
+        next_epoch = routes._media_url_epoch() + 1
+        with patch.object(routes, '_media_url_epoch', return_value=next_epoch):
+            response = self.client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+
+        self.client.post(url, json={'text': 'New', 'sender': 'user'})
+        response = self.client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['text'] for m in json.loads(response.data)], ['Earlier question', 'New'])
+
+    def test_create_session_message(self):
+        """Test a posted message is stored and unknown sessions 404"""
+        response = self.client.post(f'/api/chat_sessions/{self.session_id}/messages',
+                                    json={'text': 'Note', 'sender': 'user'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.data)['chat_session_id'], self.session_id)
+
+        response = self.client.post('/api/chat_sessions/9999/messages',
+                                    json={'text': 'Note', 'sender': 'user'})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self._stored(), [('user', 'Earlier question'), ('user', 'Note')])
+
+    def test_get_all_messages(self):
+        """Test the global message list serializes like ChatMessage.to_dict"""
+        message = ChatMessage.query.one()
+        response = self.client.get('/api/messages')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), [message.to_dict()])
+
+    @patch('app.llm_providers.openai_provider.OpenAIProvider.get_response')
+    def test_provider_instance_reused(self, mock_response):
+        """Test the provider is built once per app and shared across requests"""
+        mock_response.return_value = 'Reply'
+        for text in ('One', 'Two'):
+            self.client.post(f'/api/chat_sessions/{self.session_id}/respond_llm',
+                             json={'text': text, 'api_key': 'sk-test', 'provider': 'openai'})
+
+        providers = self.app.extensions['llm_providers']
+        self.assertEqual(list(providers), ['openai'])
+        self.assertIs(routes._get_provider('openai'), providers['openai'])
+        self.assertIsNone(routes._get_provider('unknown'))
+        self.assertEqual(mock_response.call_count, 2)
+
+    def test_unknown_session_404(self):
+        """Test replying in a session that doesn't exist returns 404"""
+        response = self.client.post('/api/chat_sessions/9999/respond_llm',
+                                    json={'text': 'Hi', 'api_key': 'sk-test', 'provider': 'openai'})
+        self.assertEqual(response.status_code, 404)
+
+    @patch('app.llm_providers.gemini_provider.GeminiProvider.get_response')
+    def test_gemini_history_loads_recent_window(self, mock_response):
+        """Test Gemini only receives the messages it keeps as context"""
+        mock_response.return_value = 'Done'
+        # Older than the 'Earlier question' message from setUp
+        base = datetime.utcnow() - timedelta(hours=1)
+        for i in range(30):
+            db.session.add(ChatMessage(text=f'old {i}', sender='user', chat_session_id=self.session_id,
+                                       timestamp=base + timedelta(seconds=i)))
+        db.session.commit()
+
+        response = self.client.post(f'/api/chat_sessions/{self.session_id}/respond_llm',
+                                    json={'text': 'Latest', 'provider': 'gemini'})
+
+        self.assertEqual(response.status_code, 200)
+        history = mock_response.call_args[0][0]
+        self.assertEqual(len(history), GeminiProvider.CONTEXT_LIMIT + 1)
+        self.assertEqual(history[0]['text'], 'old 11')
+        self.assertEqual(history[-2]['text'], 'Earlier question')
+        self.assertEqual(history[-1]['text'], 'Latest')
+
+    @patch('app.llm_providers.openai_provider.OpenAIProvider.get_response')
+    def test_identical_request_uses_cached_reply(self, mock_response):
+        """Test a second session sending the same conversation skips the provider"""
+        mock_response.return_value = 'Cached answer'
+        other = ChatSession(name='Other chat', provider='openai', user_id=ChatSession.query.one().user_id)
+        db.session.add(other)
+        db.session.flush()
+        db.session.add(ChatMessage(text='Earlier question', sender='user', chat_session_id=other.id))
+        db.session.commit()
+
+        for session_id in (self.session_id, other.id):
+            response = self.client.post(f'/api/chat_sessions/{session_id}/respond_llm',
+                                        json={'text': 'Hi', 'api_key': 'sk-test', 'provider': 'openai'})
+            self.assertEqual(json.loads(response.data)['text'], 'Cached answer')
+
+        self.assertEqual(mock_response.call_count, 1)
+        # A different API key is a different request
+        third = self.client.post(f'/api/chat_sessions/{self.session_id}/respond_llm',
+                                 json={'text': 'Hi', 'api_key': 'sk-other', 'provider': 'openai'})
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(mock_response.call_count, 2)
+
+    @patch('app.llm_providers.gemini_provider.GeminiProvider.get_response')
+    def test_cached_reply_not_shared_between_users(self, mock_response):
+        """Test users on the server's Gemini key never get each other's replies"""
+        mock_response.side_effect = ['For the first user', 'For the second user']
+        other_user = User(email='other@example.com', username='other')
+        db.session.add(other_user)
+        db.session.flush()
+        other = ChatSession(name='Other chat', provider='gemini', user_id=other_user.id)
+        db.session.add(other)
+        db.session.flush()
+        db.session.add(ChatMessage(text='Earlier question', sender='user', chat_session_id=other.id))
+        db.session.commit()
+
+        replies = []
+        for session_id in (self.session_id, other.id):
+            response = self.client.post(f'/api/chat_sessions/{session_id}/respond_llm',
+                                        json={'text': 'Hi', 'provider': 'gemini'})
+            replies.append(json.loads(response.data)['text'])
+
+        self.assertEqual(replies, ['For the first user', 'For the second user'])
+        self.assertEqual(mock_response.call_count, 2)
+
+    @patch('app.llm_providers.openai_provider.OpenAIProvider.get_response')
+    def test_history_and_owner_read_in_one_query(self, mock_response):
+        """Test the cache key's owner comes from the history query"""
+        statements = []
+        mock_response.side_effect = lambda *args: statements.append('provider') or 'Reply'
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            response = self.client.post(f'/api/chat_sessions/{self.session_id}/respond_llm',
+                                        json={'text': 'Hi', 'api_key': 'sk-test', 'provider': 'openai'})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+        self.assertEqual(response.status_code, 200)
+        before_provider = statements[:statements.index('provider')]
+        self.assertEqual(len(before_provider), 1)
+        self.assertIn('JOIN chat_session', before_provider[0])
+
+    @patch('app.services.response_cache.ResponseCache.make_key')
+    @patch('app.llm_providers.openai_provider.OpenAIProvider.get_response')
+    def test_disabled_cache_skips_key(self, mock_response, mock_make_key):
+        """Test no cache key is built when the cache is turned off"""
+        mock_response.return_value = 'Reply'
+        with patch.object(llm_response_cache, 'ttl', 0):
+            response = self.client.post(f'/api/chat_sessions/{self.session_id}/respond_llm',
+                                        json={'text': 'Hi', 'api_key': 'sk-test', 'provider': 'openai'})
+
+        self.assertEqual(response.status_code, 200)
+        mock_make_key.assert_not_called()
+
+    @patch('app.llm_providers.openai_provider.OpenAIProvider.get_response')
+    def test_provider_error_keeps_user_message(self, mock_response):
+        """Test a failed provider call still saves the user's message"""
+        mock_response.side_effect = [Exception('rate limited'), 'Error: quota exceeded']
+
+        for text in ('Hi', 'Again'):
+            response = self.client.post(f'/api/chat_sessions/{self.session_id}/respond_llm',
+                                        json={'text': text, 'api_key': 'sk-test', 'provider': 'openai'})
+            self.assertEqual(response.status_code, 500)
+
+        self.assertEqual(self._stored(), [('user', 'Earlier question'), ('user', 'Hi'), ('user', 'Again')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.llm_providers import gemini_provider
+
+
+class TestGeminiClientCache(unittest.TestCase):
+    """Test suite for the shared genai.Client cache"""
+
+    def setUp(self):
+        """Start each test with an empty client cache"""
+        gemini_provider._GEMINI_CLIENT_CACHE.clear()
+
+    def tearDown(self):
+        """Clean up cached mock clients"""
+        gemini_provider._GEMINI_CLIENT_CACHE.clear()
+
+    @patch('app.llm_providers.gemini_provider.genai.Client')
+    def test_client_reused_per_key_and_version(self, mock_client):
+        """Test clients are built once per API key and API version"""
+        mock_client.side_effect = lambda **kwargs: object()
+
+        live = gemini_provider.get_client('key-1', for_live=True)
+        self.assertIs(gemini_provider.get_client('key-1', for_live=True), live)
+        self.assertIsNot(gemini_provider.get_client('key-1'), live)
+        self.assertIsNot(gemini_provider.get_client('key-2', for_live=True), live)
+
+        self.assertEqual(mock_client.call_count, 3)
+        mock_client.assert_any_call(api_key='key-1', http_options={'api_version': 'v1alpha'})
+
+    @patch('app.llm_providers.gemini_provider.genai.Client')
+    def test_provider_uses_shared_cache(self, mock_client):
+        """Test the provider and the token endpoint share one client"""
+        mock_client.side_effect = lambda **kwargs: object()
+
+        provider_client = gemini_provider.GeminiProvider()._configure_client('key-1', for_live=True)
+        self.assertIs(gemini_provider.get_client('key-1', for_live=True), provider_client)
+        self.assertEqual(mock_client.call_count, 1)
+
+    @patch('app.llm_providers.gemini_provider.genai.Client')
+    def test_server_key_used_when_none_given(self, mock_client):
+        """Test the provider falls back to the key read at import time"""
+        provider = gemini_provider.GeminiProvider()
+
+        with patch.object(gemini_provider, '_SERVER_API_KEY', 'server-key'):
+            provider._configure_client(None)
+        mock_client.assert_called_once_with(api_key='server-key')
+
+        with patch.object(gemini_provider, '_SERVER_API_KEY', None):
+            with self.assertRaises(ValueError):
+                provider._configure_client(None)
+
+
+class TestGeminiStreamResponse(unittest.TestCase):
+    """Test suite for GeminiProvider.stream_response"""
+
+    def setUp(self):
+        """Set up an app context for the provider's logging"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        self.app_context.pop()
+
+    @patch('app.llm_providers.gemini_provider.get_client')
+    def test_empty_chunks_are_not_yielded(self, mock_get_client):
+        """Test empty and missing text chunks are filtered inside the provider"""
+        client = MagicMock()
+        client.models.generate_content_stream.return_value = (chunk for chunk in [
+            SimpleNamespace(text='Hello'),
+            SimpleNamespace(text=''),
+            SimpleNamespace(text=None, prompt_feedback=None),
+            SimpleNamespace(text=' world'),
+        ])
+        mock_get_client.return_value = client
+
+        chunks = list(gemini_provider.GeminiProvider().stream_response(
+            [{'sender': 'user', 'text': 'Hi'}], 'key-1'))
+
+        self.assertEqual(chunks, ['Hello', ' world'])
+
+    @patch('app.llm_providers.gemini_provider.get_client')
+    def test_blocked_stream_reports_reason(self, mock_get_client):
+        """Test a text-less chunk with a block reason ends the stream"""
+        client = MagicMock()
+        client.models.generate_content_stream.return_value = (chunk for chunk in [
+            SimpleNamespace(text=None, prompt_feedback=SimpleNamespace(block_reason='SAFETY')),
+            SimpleNamespace(text='ignored'),
+        ])
+        mock_get_client.return_value = client
+
+        chunks = list(gemini_provider.GeminiProvider().stream_response(
+            [{'sender': 'user', 'text': 'Hi'}], 'key-1'))
+
+        self.assertEqual(chunks, ['Content stream blocked by Gemini: SAFETY'])
+
+
+if __name__ == '__main__':
+    unittest.main()
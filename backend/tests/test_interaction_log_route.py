@@ -0,0 +1,91 @@
+import unittest
+import json
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app, db
+from app.models import User, InteractionLog, InteractionMetadata
+
+
+class TestLogInteractionRoute(unittest.TestCase):
+    """Test suite for the authenticated interaction logging endpoint"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client = self.app.test_client()
+
+        # Create all tables
+        db.create_all()
+
+        user = User(email='test@example.com', username='testuser')
+        db.session.add(user)
+        db.session.commit()
+
+        with self.client.session_transaction() as sess:
+            sess['user_id'] = user.id
+            sess['logged_in'] = True
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_metadata_columns_and_custom_fields(self):
+        """Test known metadata keys fill columns and the rest go to custom_metadata"""
+        response = self.client.post('/api/interaction-logs', json={
+            'session_id': 'session_12345678',
+            'interaction_type': 'user_action',
+            'metadata': {
+                'timestamp': '2025-01-01T12:00:00.000Z',
+                'frame_rate': 2,
+                'camera_on': True,
+                'video_resolution': {'width': 640, 'height': 480},
+                'action_type': 'connect',
+            },
+        })
+
+        self.assertEqual(response.status_code, 201)
+        log = db.session.get(InteractionLog, json.loads(response.data)['interaction_id'])
+        metadata = InteractionMetadata.query.filter_by(interaction_log_id=log.id).one()
+
+        self.assertEqual(metadata.frame_rate, 2)
+        self.assertTrue(metadata.camera_on)
+        self.assertIsNone(metadata.microphone_on)
+        self.assertEqual((metadata.video_resolution_width, metadata.video_resolution_height), (640, 480))
+        self.assertEqual(metadata.custom_metadata, {'action_type': 'connect'})
+
+    def test_metadata_without_custom_fields(self):
+        """Test custom_metadata stays empty when only standard keys are sent"""
+        response = self.client.post('/api/interaction-logs', json={
+            'session_id': 'session_12345678',
+            'interaction_type': 'user_action',
+            'metadata': {'microphone_on': False},
+        })
+
+        self.assertEqual(response.status_code, 201)
+        metadata = InteractionMetadata.query.one()
+        self.assertFalse(metadata.microphone_on)
+        self.assertIsNone(metadata.custom_metadata)
+
+    def test_missing_required_fields(self):
+        """Test session_id and interaction_type are required"""
+        response = self.client.post('/api/interaction-logs', json={'session_id': 'session_12345678'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_malformed_body_rejected(self):
+        """Test a body that isn't a JSON object is rejected as a bad request"""
+        for body in (b'', b'{not json', b'[1, 2]'):
+            response = self.client.post('/api/interaction-logs', data=body,
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import unittest
+import base64
+import json
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app, db
+from app.models import InteractionLog, InteractionMediaData
+from app.api import routes
+from app.api.routes import _decode_interaction_media, _background_gcs_upload, _media_content_type
+
+
+class TestDecodeInteractionMedia(unittest.TestCase):
+    """Test suite for decoding logged interaction media"""
+
+    def test_audio_chunk_missing_padding(self):
+        """Test base64 audio without trailing padding is decoded as PCM"""
+        raw = base64.b64encode(b'\x00\x01\x02\x03\x04').decode().rstrip('=')
+        self.assertEqual(
+            _decode_interaction_media('audio_chunk', raw),
+            (b'\x00\x01\x02\x03\x04', 'pcm', 'audio/pcm')
+        )
+
+    def test_video_frame(self):
+        """Test video frames are typed as JPEG"""
+        raw = base64.b64encode(b'jpegbytes').decode()
+        self.assertEqual(
+            _decode_interaction_media('video_frame', raw),
+            (b'jpegbytes', 'jpg', 'image/jpeg')
+        )
+
+    def test_text_input_is_not_base64_decoded(self):
+        """Test text input is stored as plain text even if it looks like base64"""
+        self.assertEqual(
+            _decode_interaction_media('text_input', 'abcd'),
+            (b'abcd', 'txt', 'text/plain')
+        )
+
+    def test_api_response_json_envelope(self):
+        """Test api_response JSON envelopes unwrap their base64 payload"""
+        raw = json.dumps({'data': base64.b64encode(b'audio').decode(), 'mimeType': 'audio/pcm;rate=24000'})
+        self.assertEqual(
+            _decode_interaction_media('api_response', raw),
+            (b'audio', 'pcm', 'audio/pcm;rate=24000')
+        )
+
+    def test_api_response_plain_text(self):
+        """Test short non-JSON api_response content is treated as text"""
+        self.assertEqual(
+            _decode_interaction_media('api_response', 'Hello there'),
+            (b'Hello there', 'txt', 'text/plain')
+        )
+
+    def test_api_response_large_base64_is_audio(self):
+        """Test long base64-looking api_response content is treated as audio"""
+        audio = bytes(range(256)) * 8
+        raw = base64.b64encode(audio).decode()
+        self.assertEqual(
+            _decode_interaction_media('api_response', raw),
+            (audio, 'pcm', 'audio/pcm')
+        )
+
+
+class TestMediaContentType(unittest.TestCase):
+    """Test suite for the replay Content-Type lookup"""
+
+    def _log(self, interaction_type, api_endpoint=None):
+        metadata = SimpleNamespace(api_endpoint=api_endpoint) if api_endpoint else None
+        return SimpleNamespace(interaction_type=interaction_type, interaction_metadata=metadata)
+
+    def test_typed_by_interaction_type(self):
+        """Test non-api_response media is typed by interaction type alone"""
+        self.assertEqual(_media_content_type(self._log('audio_chunk'), b'', 'a.bin'), 'audio/pcm')
+        self.assertEqual(_media_content_type(self._log('video_frame'), b''), 'image/jpeg')
+        self.assertEqual(_media_content_type(self._log('text_input'), b''), 'text/plain; charset=utf-8')
+        self.assertEqual(_media_content_type(self._log('user_action'), b''), 'application/octet-stream')
+
+    def test_api_response_extension_ignores_signed_query(self):
+        """Test the stored extension is found before a signed URL query string"""
+        url = 'https://storage.googleapis.com/bucket/interactions/x_api_response_1.json?X-Goog-Signature=abc'
+        self.assertEqual(_media_content_type(self._log('api_response'), b'{}', url), 'application/json')
+
+    def test_api_response_sniffed_by_size(self):
+        """Test api_response media without a known extension falls back to size"""
+        big = b'\x00' * 2000
+        self.assertEqual(_media_content_type(self._log('api_response', 'gemini_live_api'), big, 'blob'), 'audio/pcm')
+        self.assertEqual(_media_content_type(self._log('api_response'), big, 'blob'), 'text/plain; charset=utf-8')
+        self.assertEqual(_media_content_type(self._log('api_response'), big), 'audio/pcm')
+        self.assertEqual(_media_content_type(self._log('api_response'), b'hi'), 'text/plain; charset=utf-8')
+
+
+class TestBackgroundGcsUpload(unittest.TestCase):
+    """Test suite for the background GCS upload job"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        log = InteractionLog(session_id='session_12345678', interaction_type='audio_chunk')
+        db.session.add(log)
+        db.session.flush()
+        self.media = InteractionMediaData(
+            interaction_log_id=log.id,
+            storage_type='cloud_storage',
+            cloud_storage_url=f'pending_upload_{log.id}'
+        )
+        db.session.add(self.media)
+        db.session.commit()
+        self.log_id = log.id
+        self.media_id = self.media.id
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    @patch('app.api.routes.GCSStorageService.upload_file')
+    def test_upload_success_stores_url(self, mock_upload):
+        """Test a successful upload replaces the pending URL"""
+        mock_upload.return_value = ('https://storage.example/audio.pcm', 'interactions/audio.pcm')
+
+        _background_gcs_upload(self.app, self.log_id, self.media_id, b'pcm', 'pcm', 'audio/pcm',
+                               'audio_chunk', 'session_12345678')
+
+        db.session.expire_all()
+        media = db.session.get(InteractionMediaData, self.media_id)
+        self.assertEqual(media.cloud_storage_url, 'https://storage.example/audio.pcm')
+        uploaded = mock_upload.call_args[0][0]
+        self.assertEqual(uploaded.getvalue(), b'pcm')
+        self.assertEqual(uploaded.content_type, 'audio/pcm')
+
+    @patch('app.api.routes.GCSStorageService.upload_file')
+    def test_upload_failure_falls_back_to_hash_only(self, mock_upload):
+        """Test a failed upload marks the media as hash-only"""
+        mock_upload.side_effect = Exception('GCS unavailable')
+
+        _background_gcs_upload(self.app, self.log_id, self.media_id, b'pcm', 'pcm', 'audio/pcm',
+                               'audio_chunk', 'session_12345678')
+
+        db.session.expire_all()
+        media = db.session.get(InteractionMediaData, self.media_id)
+        self.assertEqual(media.storage_type, 'hash_only')
+        self.assertIsNone(media.cloud_storage_url)
+
+
+class TestUploadBacklog(unittest.TestCase):
+    """Test suite for the pending upload cap"""
+
+    def test_pending_count_released_when_upload_finishes(self):
+        """Test submitted uploads count against the cap until they finish"""
+        with patch.object(routes, 'MAX_PENDING_UPLOADS', 1):
+            release = routes.threading.Event()
+            future = routes._submit_upload(release.wait)
+            self.assertFalse(routes._upload_capacity_available())
+
+            release.set()
+            future.result(timeout=5)
+            # The done callback runs just after the result is published
+            for _ in range(100):
+                if routes._upload_capacity_available():
+                    break
+                time.sleep(0.01)
+            self.assertTrue(routes._upload_capacity_available())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app import create_app
+
+
+class TestOrjsonProvider(unittest.TestCase):
+    """Test suite for the orjson-backed JSON provider"""
+
+    def setUp(self):
+        """Set up an app using the provider and a stock Flask reference"""
+        self.app = create_app('testing')
+        self.reference = DefaultJSONProvider(Flask('reference'))
+
+    def test_matches_default_provider_output(self):
+        """Test keys are sorted and dates use Flask's HTTP-date format"""
+        payload = {
+            'b': 1,
+            'a': {'z': datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc), 'y': date(2025, 1, 2)},
+            'price': Decimal('1.50'),
+        }
+
+        dumped = self.app.json.dumps(payload)
+
+        self.assertEqual(json.loads(dumped), json.loads(self.reference.dumps(payload)))
+        self.assertEqual(list(json.loads(dumped)), ['a', 'b', 'price'])
+        self.assertEqual(json.loads(dumped)['a']['z'], 'Thu, 02 Jan 2025 03:04:05 GMT')
+
+    def test_response_body_matches_dumps(self):
+        """Test jsonify produces the same bytes as dumps"""
+        payload = {'when': datetime(2025, 1, 2, 3, 4, 5), 'b': [1, 2], 'a': None}
+        with self.app.app_context():
+            response = self.app.json.response(payload)
+        self.assertEqual(response.get_data(as_text=True), self.app.json.dumps(payload))
+        self.assertEqual(json.loads(response.data), json.loads(self.reference.dumps(payload)))
+
+    def test_sort_keys_can_be_disabled(self):
+        """Test the app's sort_keys setting is honoured"""
+        self.app.json.sort_keys = False
+        self.assertEqual(self.app.json.dumps({'b': 1, 'a': 2}), '{"b":1,"a":2}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.llm_providers import openai_provider
+
+
+class TestOpenAIClientPool(unittest.TestCase):
+    """Test suite for the shared OpenAI HTTP connection pool"""
+
+    def setUp(self):
+        """Start each test without a pooled client"""
+        openai_provider._HTTP_CLIENT = None
+
+    def tearDown(self):
+        """Close the pooled client created by the test"""
+        if openai_provider._HTTP_CLIENT is not None:
+            openai_provider._HTTP_CLIENT.close()
+        openai_provider._HTTP_CLIENT = None
+
+    def test_clients_share_http_pool(self):
+        """Test clients for different keys use one httpx.Client"""
+        first = openai_provider.get_client('sk-one')
+        second = openai_provider.get_client('sk-two')
+
+        self.assertEqual(first.api_key, 'sk-one')
+        self.assertEqual(second.api_key, 'sk-two')
+        self.assertIs(first._client, second._client)
+        self.assertIs(first._client, openai_provider._get_http_client())
+
+    @patch('app.llm_providers.openai_provider.get_client')
+    def test_get_response_uses_pooled_client(self, mock_get_client):
+        """Test replies are requested through get_client"""
+        completion = mock_get_client.return_value.chat.completions.create.return_value
+        completion.choices[0].message.content = ' Hi there '
+
+        reply = openai_provider.OpenAIProvider().get_response(
+            [{'role': 'user', 'content': 'Hi'}], 'sk-test')
+
+        self.assertEqual(reply, 'Hi there')
+        mock_get_client.assert_called_once_with('sk-test')
+
+
+if __name__ == '__main__':
+    unittest.main()
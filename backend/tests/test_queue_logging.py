@@ -0,0 +1,77 @@
+import unittest
+import logging
+import os
+import time
+
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import Flask
+
+from app import _configure_queue_logging
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class TestQueueLogging(unittest.TestCase):
+    """Test suite for app.logger's queued handlers"""
+
+    def setUp(self):
+        """Route a throwaway app's logger through a recording handler"""
+        self.app = Flask('queue-logging-test')
+        self.target = _ListHandler()
+        self.app.logger.handlers = [self.target]
+        self.app.logger.setLevel(logging.INFO)
+        _configure_queue_logging(self.app)
+        self.queue_handler = self.app.logger.handlers[0]
+
+    def tearDown(self):
+        """Stop the listener thread"""
+        self.queue_handler.stop()
+        self.app.logger.handlers = []
+
+    def _wait_for(self, messages, handler):
+        for _ in range(100):
+            if handler.messages == messages:
+                break
+            time.sleep(0.01)
+        self.assertEqual(handler.messages, messages)
+
+    def test_records_reach_original_handlers(self):
+        """Test records are delivered by the listener thread"""
+        self.app.logger.info('hello %s', 'world')
+        self._wait_for(['hello world'], self.target)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires os.fork')
+    def test_forked_child_drains_its_own_records(self):
+        """Test a process forked after setup (a gunicorn worker) still logs"""
+        self.app.logger.info('parent')
+        self._wait_for(['parent'], self.target)
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(read_fd)
+                self.target.emit = lambda record: os.write(write_fd, record.getMessage().encode())
+                self.app.logger.info('child')
+                self.queue_handler.stop()
+            finally:
+                os._exit(0)
+
+        os.close(write_fd)
+        with os.fdopen(read_fd, 'rb') as pipe:
+            received = pipe.read()
+        os.waitpid(pid, 0)
+        self.assertEqual(received, b'child')
+
+
+if __name__ == '__main__':
+    unittest.main()
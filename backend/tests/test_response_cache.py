@@ -0,0 +1,57 @@
+import unittest
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services import response_cache
+from app.services.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test suite for the in-process LLM reply cache"""
+
+    def test_key_depends_on_every_input(self):
+        """Test provider, model, API key, user and history all change the key"""
+        history = [{'role': 'user', 'content': 'Hi'}]
+        key = ResponseCache.make_key('openai', 'gpt-4o', 'sk-1', 1, history)
+
+        self.assertEqual(key, ResponseCache.make_key('openai', 'gpt-4o', 'sk-1', 1, [{'content': 'Hi', 'role': 'user'}]))
+        self.assertNotEqual(key, ResponseCache.make_key('gemini', 'gpt-4o', 'sk-1', 1, history))
+        self.assertNotEqual(key, ResponseCache.make_key('openai', 'gpt-4o-mini', 'sk-1', 1, history))
+        self.assertNotEqual(key, ResponseCache.make_key('openai', 'gpt-4o', 'sk-2', 1, history))
+        self.assertNotEqual(key, ResponseCache.make_key('openai', 'gpt-4o', 'sk-1', 2, history))
+        self.assertNotEqual(key, ResponseCache.make_key('openai', 'gpt-4o', 'sk-1', 1, history * 2))
+
+    def test_least_recently_used_entry_evicted(self):
+        """Test the cache keeps at most max_entries replies"""
+        cache = ResponseCache(max_entries=2, ttl=60)
+        cache.put('a', 'A')
+        cache.put('b', 'B')
+        cache.get('a')
+        cache.put('c', 'C')
+
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 'C')
+
+    def test_entries_expire(self):
+        """Test replies are dropped after the TTL"""
+        cache = ResponseCache(max_entries=2, ttl=60)
+        with patch.object(response_cache.time, 'monotonic', return_value=1000.0):
+            cache.put('a', 'A')
+        with patch.object(response_cache.time, 'monotonic', return_value=1059.0):
+            self.assertEqual(cache.get('a'), 'A')
+        with patch.object(response_cache.time, 'monotonic', return_value=1060.0):
+            self.assertIsNone(cache.get('a'))
+
+    def test_zero_ttl_disables_cache(self):
+        """Test a TTL of 0 turns the cache off"""
+        cache = ResponseCache(max_entries=2, ttl=0)
+        cache.put('a', 'A')
+        self.assertIsNone(cache.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from io import BytesIO
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app
+from app.services import storage
+from app.services.storage import GCSStorageService
+
+
+class TestGCSStorageService(unittest.TestCase):
+    """Test suite for uploads through GCSStorageService"""
+
+    def setUp(self):
+        """Set up an app context and reset the shared client"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        storage._storage_client = None
+
+    def tearDown(self):
+        """Clean up test environment"""
+        storage._storage_client = None
+        self.app_context.pop()
+
+    def _upload(self, data):
+        file = BytesIO(data)
+        file.filename = 'clip.webm'
+        file.content_type = 'video/webm'
+        return GCSStorageService.upload_file(file)
+
+    @patch('app.services.storage.storage.Client')
+    def test_client_shared_across_uploads(self, mock_client):
+        """Test one storage client serves every upload and URL refresh"""
+        self._upload(b'a')
+        self._upload(b'b')
+        GCSStorageService.regenerate_signed_url('clip.webm')
+
+        mock_client.assert_called_once_with()
+
+    @patch('app.services.storage.storage.Client')
+    def test_upload_streams_with_size_and_chunks(self, mock_client):
+        """Test the file is uploaded from its stream with its size and chunk size"""
+        bucket = mock_client.return_value.bucket.return_value
+        blob = bucket.blob.return_value
+        blob.generate_signed_url.return_value = 'https://storage.example/clip.webm'
+
+        url, content_type = self._upload(b'x' * 1000)
+
+        self.assertEqual((url, content_type), ('https://storage.example/clip.webm', 'video/webm'))
+        self.assertEqual(bucket.blob.call_args.kwargs['chunk_size'], storage.UPLOAD_CHUNK_SIZE)
+        upload_kwargs = blob.upload_from_file.call_args.kwargs
+        self.assertEqual(upload_kwargs['size'], 1000)
+        self.assertEqual(upload_kwargs['content_type'], 'video/webm')
+
+    def test_stream_size_of_unseekable_stream(self):
+        """Test streams that can't seek report no size"""
+        self.assertIsNone(storage._stream_size(object()))
+        stream = BytesIO(b'abcdef')
+        stream.seek(2)
+        self.assertEqual(storage._stream_size(stream), 4)
+        self.assertEqual(stream.tell(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import json
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import create_app, db
+from app.models import User, Task
+
+
+class TestTaskRoutes(unittest.TestCase):
+    """Test suite for the task endpoints"""
+
+    def setUp(self):
+        """Set up test environment"""
+        self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client = self.app.test_client()
+
+        # Create all tables
+        db.create_all()
+
+        user = User(email='test@example.com', username='testuser')
+        db.session.add(user)
+        db.session.flush()
+        self.task = Task(title='Write tests', description='For the list endpoint', user_id=user.id)
+        db.session.add(self.task)
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up test environment"""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_list_matches_task_to_dict(self):
+        """Test the projected task list serializes like Task.to_dict"""
+        response = self.client.get('/api/tasks')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), [self.task.to_dict()])
+
+    def test_list_revalidates_with_etag(self):
+        """Test an unchanged list returns 304 and an edited one returns the new body"""
+        etag = self.client.get('/api/tasks').headers['ETag']
+
+        response = self.client.get('/api/tasks', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+        self.client.put(f'/api/tasks/{self.task.id}', json={'completed': True})
+        response = self.client.get('/api/tasks', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(json.loads(response.data)[0]['completed'])
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_get_update_delete_by_id(self):
+        """Test single-task routes find the task by primary key"""
+        task_id = self.task.id
+
+        response = self.client.get(f'/api/tasks/{task_id}')
+        self.assertEqual(json.loads(response.data)['title'], 'Write tests')
+
+        response = self.client.put(f'/api/tasks/{task_id}', json={'completed': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(json.loads(response.data)['completed'])
+
+        response = self.client.delete(f'/api/tasks/{task_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(db.session.get(Task, task_id))
+
+    def test_unknown_task_404(self):
+        """Test missing tasks return 404 on every single-task route"""
+        self.assertEqual(self.client.get('/api/tasks/9999').status_code, 404)
+        self.assertEqual(self.client.put('/api/tasks/9999', json={'title': 'x'}).status_code, 404)
+        self.assertEqual(self.client.delete('/api/tasks/9999').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()